@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Browser Backends - Browser control for the kiosk controller
+SeleniumBackend drives Chromium through chromedriver; CDPBackend talks to
+Chromium's remote debugging websocket directly, one process fewer
+
+Both expose the same tab operations, addressed by an opaque tab id
+(a window handle for Selenium, a target id for CDP):
+start, quit, first_tab, open_tab, close_tab, activate, navigate,
+reload, get_url, evaluate, browser_pid,
+set_frozen (a no-op where can_freeze is False)
+
+can_prewarm says whether reload(tab, background=True) leaves the visible
+tab alone; only then does the controller reload pages ahead of their turn.
+"""
+
+import time
+import shutil
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from cdp import CDPConnection, CDPError, http_json
+from chromium_profile import prepare_profile
+
+try:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+except ImportError:  # only needed for the selenium backend
+    webdriver = None
+
+CHROMEDRIVER_PATH = "/usr/bin/chromedriver"
+CHROMIUM_BINARY = "/usr/bin/chromium-browser"
+
+BACKENDS = ('selenium', 'cdp')
+DEFAULT_CDP_PORT = 9222
+BROWSER_START_TIMEOUT = 30
+
+
+def chromium_arguments(profile_dir=None, disk_cache_mb=None):
+    """
+    Command line flags shared by every way of launching the kiosk browser.
+
+    Args:
+        profile_dir (Path or str): Persistent --user-data-dir, or None for
+            the caller's default (a throwaway profile)
+        disk_cache_mb (int): Disk cache size limit in megabytes
+    """
+    arguments = [
+        # Kiosk mode settings
+        "--kiosk",
+        "--start-maximized",
+        "--noerrdialogs",
+        "--disable-infobars",
+        "--disable-session-crashed-bubble",
+        "--disable-restore-session-state",
+
+        # Allow loading local file:// URLs
+        "--allow-file-access-from-files",
+        "--allow-file-access",
+
+        # Disable distracting features
+        "--disable-features=TranslateUI",
+        "--disable-pinch",
+        "--overscroll-history-navigation=0",
+        "--disable-gesture-typing",
+
+        # Performance optimizations for Raspberry Pi
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--disable-gpu",
+        "--disable-software-rasterizer",
+
+        # Logging (helpful for debugging)
+        "--enable-logging=stderr",
+        "--v=1",
+    ]
+
+    if profile_dir:
+        arguments.append(f"--user-data-dir={profile_dir}")
+    if disk_cache_mb:
+        arguments.append(f"--disk-cache-size={int(disk_cache_mb) * 1024 * 1024}")
+    return arguments
+
+
+class SeleniumBackend:
+    """
+    Chromium via chromedriver.
+
+    WebDriver can only script the tab it is switched to, and switching
+    brings that tab to the front. Operations on other tabs therefore switch
+    to them briefly and then back to the active tab.
+    """
+
+    name = 'selenium'
+    can_freeze = False  # a tab would have to be brought to the front to freeze it
+    can_prewarm = False  # same for reloading or opening it
+
+    def __init__(self, log=print, profile_dir=None, disk_cache_mb=None):
+        self.log = log
+        self.profile_dir = profile_dir
+        self.disk_cache_mb = disk_cache_mb
+        self.driver = None
+        self.active_tab = None
+
+    def start(self):
+        if webdriver is None:
+            raise RuntimeError("Selenium is not installed (pip3 install selenium)")
+
+        chrome_options = Options()
+        chrome_options.binary_location = CHROMIUM_BINARY
+        if self.profile_dir:
+            prepare_profile(self.profile_dir, log=self.log)
+        for argument in chromium_arguments(self.profile_dir, self.disk_cache_mb):
+            chrome_options.add_argument(argument)
+
+        # Disable automation flags
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option("useAutomationExtension", False)
+
+        service = Service(CHROMEDRIVER_PATH)
+        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        self.driver.set_page_load_timeout(30)
+        self.active_tab = self.driver.current_window_handle
+
+    def quit(self):
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+
+    @contextmanager
+    def _on_tab(self, tab):
+        """Point WebDriver at a tab for one operation, then back at the active tab"""
+        if tab == self.active_tab:
+            yield
+            return
+        self.driver.switch_to.window(tab)
+        try:
+            yield
+        finally:
+            self.driver.switch_to.window(self.active_tab)
+
+    def first_tab(self):
+        return self.driver.window_handles[0]
+
+    def open_tab(self, url):
+        known = set(self.driver.window_handles)
+        self.driver.execute_script("window.open(arguments[0], '_blank');", url)
+
+        new_handles = [handle for handle in self.driver.window_handles if handle not in known]
+        if not new_handles:
+            raise RuntimeError(f"Browser did not open a tab for {url}")
+        return new_handles[0]
+
+    def close_tab(self, tab):
+        self.driver.switch_to.window(tab)
+        self.driver.close()
+        if tab == self.active_tab:
+            # Never leave the driver on a closed window; Chromium shows another tab now
+            self.active_tab = self.driver.window_handles[0]
+        self.driver.switch_to.window(self.active_tab)
+
+    def activate(self, tab):
+        self.driver.switch_to.window(tab)
+        self.active_tab = tab
+
+    def navigate(self, tab, url):
+        if tab == self.active_tab:
+            self.driver.get(url)
+            return
+        with self._on_tab(tab):
+            # driver.get() would keep the tab in front until it loads
+            self.driver.execute_script("setTimeout(() => window.location.assign(arguments[0]), 0);", url)
+
+    def reload(self, tab, background=False):
+        if tab == self.active_tab and not background:
+            self.driver.refresh()
+            return
+        with self._on_tab(tab):
+            # Deferred so the WebDriver call returns before navigation starts
+            self.driver.execute_script("setTimeout(() => window.location.reload(), 0);")
+
+    def get_url(self, tab):
+        with self._on_tab(tab):
+            return self.driver.current_url
+
+    def evaluate(self, tab, expression, timeout=None):
+        # WebDriver has no per-call timeout; a hung page blocks until chromedriver gives up
+        with self._on_tab(tab):
+            return self.driver.execute_script(f"return {expression};")
+
+    def set_frozen(self, tab, frozen):
+        """Does nothing: can_freeze is False, so tabs keep running while hidden"""
+
+    def browser_pid(self):
+        """Return the pid of chromedriver, whose child processes are the browser"""
+        return self.driver.service.process.pid
+
+
+class CDPBackend:
+    """
+    Chromium via its remote debugging websocket.
+
+    Tab management goes through the browser-level connection (Target.*),
+    page commands through one cached connection per tab. Nothing here
+    changes which tab is visible except activate(), so background tabs
+    can be reloaded and inspected without showing them.
+    """
+
+    name = 'cdp'
+    can_freeze = True
+    can_prewarm = True
+
+    def __init__(self, log=print, port=DEFAULT_CDP_PORT, attach=False, profile_dir=None, disk_cache_mb=None):
+        self.log = log
+        self.port = port
+        self.attach = attach
+        self.profile_dir = profile_dir
+        self.disk_cache_mb = disk_cache_mb
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.process = None
+        self.temp_profile_dir = None
+        self.browser_conn = None
+        self.page_conns = {}
+
+    def start(self):
+        if not self.attach:
+            if self.profile_dir:
+                prepare_profile(self.profile_dir, log=self.log)
+                profile_dir = self.profile_dir
+            else:
+                # Chromium needs some user-data-dir to enable remote debugging
+                profile_dir = self.temp_profile_dir = tempfile.mkdtemp(prefix='kiosk-chromium-')
+            command = [CHROMIUM_BINARY, *chromium_arguments(profile_dir, self.disk_cache_mb),
+                       f"--remote-debugging-port={self.port}",
+                       "about:blank"]
+            self.process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+
+        version = self._wait_for_endpoint()
+        self.browser_conn = CDPConnection(version['webSocketDebuggerUrl'])
+        self.log(f"[INFO] Connected to {version.get('Browser', 'browser')} over CDP on port {self.port}")
+
+    def _wait_for_endpoint(self):
+        deadline = time.monotonic() + BROWSER_START_TIMEOUT
+        while True:
+            if self.process and self.process.poll() is not None:
+                raise RuntimeError(f"Chromium exited with code {self.process.returncode}")
+            try:
+                return http_json(self.base_url, '/json/version', timeout=2)
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(f"No DevTools endpoint on port {self.port} after {BROWSER_START_TIMEOUT}s")
+                time.sleep(0.25)
+
+    def quit(self):
+        for conn in self.page_conns.values():
+            conn.close()
+        self.page_conns = {}
+
+        if self.browser_conn and not self.attach:
+            try:
+                self.browser_conn.send('Browser.close', timeout=5)
+            except CDPError:
+                pass
+        if self.browser_conn:
+            self.browser_conn.close()
+            self.browser_conn = None
+
+        if self.process:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+        if self.temp_profile_dir:
+            shutil.rmtree(self.temp_profile_dir, ignore_errors=True)
+            self.temp_profile_dir = None
+
+    def _page(self, tab):
+        """Return a live connection to a tab, reconnecting if the last one failed"""
+        conn = self.page_conns.get(tab)
+        if conn is None or conn.closed:
+            conn = CDPConnection(f"ws://127.0.0.1:{self.port}/devtools/page/{quote(tab)}")
+            self.page_conns[tab] = conn
+        return conn
+
+    def first_tab(self):
+        targets = self.browser_conn.send('Target.getTargets')['targetInfos']
+        pages = [target['targetId'] for target in targets if target['type'] == 'page']
+        if not pages:
+            return self.browser_conn.send('Target.createTarget', {"url": "about:blank"})['targetId']
+        return pages[0]
+
+    def open_tab(self, url):
+        result = self.browser_conn.send('Target.createTarget', {"url": url, "background": True})
+        return result['targetId']
+
+    def close_tab(self, tab):
+        conn = self.page_conns.pop(tab, None)
+        if conn:
+            conn.close()
+        self.browser_conn.send('Target.closeTarget', {"targetId": tab})
+
+    def activate(self, tab):
+        self.browser_conn.send('Target.activateTarget', {"targetId": tab})
+
+    def navigate(self, tab, url):
+        self._page(tab).send('Page.navigate', {"url": url})
+
+    def reload(self, tab, background=False):
+        # Page.reload returns once navigation starts; callers wait for readiness separately
+        self._page(tab).send('Page.reload', {"ignoreCache": False})
+
+    def get_url(self, tab):
+        result = self.browser_conn.send('Target.getTargetInfo', {"targetId": tab})
+        return result['targetInfo']['url']
+
+    def evaluate(self, tab, expression, timeout=None):
+        result = self._page(tab).send('Runtime.evaluate', {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": True
+        }, timeout=timeout)
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            raise CDPError(details.get('exception', {}).get('description') or details.get('text', 'Evaluation failed'))
+        return result['result'].get('value')
+
+    def browser_pid(self):
+        """Return the pid of Chromium's main process, or None if unknown"""
+        if self.process:
+            return self.process.pid
+        processes = self.browser_conn.send('SystemInfo.getProcessInfo')['processInfo']
+        return next((process['id'] for process in processes if process['type'] == 'browser'), None)
+
+    def set_frozen(self, tab, frozen):
+        """
+        Freeze or resume a tab's page lifecycle.
+
+        A frozen page runs no timers, animation frames or network callbacks.
+        Chromium only freezes hidden pages, so freeze a tab after switching
+        away from it and resume it before showing it again.
+        """
+        state = 'frozen' if frozen else 'active'
+        self._page(tab).send('Page.setWebLifecycleState', {"state": state})
+
+
+def create_backend(name, log=print, **options):
+    """
+    Create a browser backend by name.
+
+    Args:
+        name (str): 'selenium' or 'cdp'
+        log (callable): Logging function
+        **options: Backend options (both: profile_dir, disk_cache_mb;
+            cdp: port, attach)
+    """
+    if name == 'selenium':
+        return SeleniumBackend(log=log, **options)
+    if name == 'cdp':
+        return CDPBackend(log=log, **options)
+    raise ValueError(f"Unknown browser backend '{name}' (expected one of {', '.join(BACKENDS)})")
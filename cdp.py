@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+CDP Client - Minimal Chrome DevTools Protocol client
+Talks to Chromium's remote debugging websocket using only the standard
+library, so the kiosk can drive the browser without chromedriver
+"""
+
+import os
+import json
+import base64
+import socket
+import struct
+import hashlib
+import itertools
+import threading
+import urllib.request
+from urllib.parse import urlparse
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class CDPError(Exception):
+    """Raised when Chromium returns an error or the connection fails"""
+
+
+def websocket_accept_key(key):
+    """Return the Sec-WebSocket-Accept value for a client key"""
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def _apply_mask(data, key):
+    if not data:
+        return data
+    repeated = (key * (len(data) // 4 + 1))[:len(data)]
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(len(data), 'big')
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=True):
+    """
+    Encode a single websocket frame.
+
+    Clients must mask their frames and servers must not (RFC 6455), so the
+    fake CDP server reuses this with mask=False.
+    """
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 65536:
+        header.append(mask_bit | 126)
+        header += struct.pack('!H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('!Q', length)
+
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = _apply_mask(payload, key)
+    return bytes(header) + payload
+
+
+def _read_exact(rfile, count):
+    data = rfile.read(count)
+    if len(data) < count:
+        raise ConnectionError("Websocket connection closed")
+    return data
+
+
+def read_frame(rfile):
+    """
+    Read one websocket frame from a binary file-like object.
+
+    Returns:
+        tuple: (fin, opcode, payload)
+    """
+    first, second = _read_exact(rfile, 2)
+    fin = bool(first & 0x80)
+    opcode = first & 0x0F
+    masked = bool(second & 0x80)
+    length = second & 0x7F
+
+    if length == 126:
+        length = struct.unpack('!H', _read_exact(rfile, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', _read_exact(rfile, 8))[0]
+
+    key = _read_exact(rfile, 4) if masked else None
+    payload = _read_exact(rfile, length)
+    if key:
+        payload = _apply_mask(payload, key)
+    return fin, opcode, payload
+
+
+class CDPConnection:
+    """
+    A websocket connection to one DevTools target (the browser or a page).
+
+    Commands are sent one at a time; events received while waiting for a
+    reply are ignored. A timeout leaves the stream in an unknown state, so
+    the connection is closed and the caller should open a new one.
+    """
+
+    def __init__(self, ws_url, timeout=10):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.closed = False
+
+        parsed = urlparse(ws_url)
+        self._sock = socket.create_connection((parsed.hostname, parsed.port or 80), timeout=timeout)
+        self._rfile = self._sock.makefile('rb')
+        self._handshake(parsed)
+
+    def _handshake(self, parsed):
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = parsed.path + (f'?{parsed.query}' if parsed.query else '')
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {parsed.hostname}:{parsed.port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n"
+            "\r\n"
+        )
+        self._sock.sendall(request.encode())
+
+        status = self._rfile.readline()
+        headers = {}
+        while True:
+            line = self._rfile.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if b' 101 ' not in status or headers.get('sec-websocket-accept') != websocket_accept_key(key):
+            self.close()
+            raise CDPError(f"Websocket handshake failed for {self.ws_url}: {status.decode(errors='replace').strip()}")
+
+    def _recv_message(self):
+        chunks = []
+        while True:
+            fin, opcode, payload = read_frame(self._rfile)
+            if opcode == OP_PING:
+                self._sock.sendall(encode_frame(payload, OP_PONG))
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                raise ConnectionError("Websocket closed by browser")
+            chunks.append(payload)
+            if fin:
+                return b''.join(chunks)
+
+    def send(self, method, params=None, timeout=None):
+        """
+        Send a command and wait for its result.
+
+        Raises:
+            CDPError: If Chromium reports an error, the connection drops or
+                no reply arrives within the timeout
+        """
+        if self.closed:
+            raise CDPError("Connection is closed")
+
+        with self._lock:
+            message_id = next(self._ids)
+            message = {"id": message_id, "method": method, "params": params or {}}
+            try:
+                self._sock.settimeout(timeout or self.timeout)
+                self._sock.sendall(encode_frame(json.dumps(message).encode()))
+                while True:
+                    reply = json.loads(self._recv_message())
+                    if reply.get('id') == message_id:
+                        break
+            except (OSError, ConnectionError, ValueError) as e:
+                self.close()
+                raise CDPError(f"{method} failed: {e or type(e).__name__}") from e
+
+        if 'error' in reply:
+            raise CDPError(f"{method}: {reply['error'].get('message', reply['error'])}")
+        return reply.get('result', {})
+
+    def close(self):
+        """Close the connection (safe to call more than once)"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._sock.sendall(encode_frame(b'', OP_CLOSE))
+        except OSError:
+            pass
+        try:
+            self._rfile.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+
+def http_json(base_url, path, method='GET', timeout=5):
+    """Call one of the DevTools HTTP endpoints (/json/version, /json/list, ...)"""
+    request = urllib.request.Request(base_url + path, method=method)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read() or b'null')
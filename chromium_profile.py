@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Chromium Profile - Persistent user-data-dir for the kiosk browser
+Keeps Chromium's disk cache between restarts so pages load from cache
+after the first boot, and repairs what an unclean shutdown leaves behind
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+DEFAULT_PROFILE_DIR = Path.home() / '.cache' / 'kiosk-chromium'
+DEFAULT_DISK_CACHE_MB = 200
+
+# Left behind when Chromium is killed; a stale lock makes the next launch
+# think another browser is using the profile
+SINGLETON_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+
+def _load_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    tmp_path.replace(path)
+
+
+def reset_profile(profile_dir):
+    """Delete a profile completely; Chromium recreates it on the next start"""
+    shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def prepare_profile(profile_dir, log=print):
+    """
+    Get a persistent profile ready for launch.
+
+    Removes stale singleton locks and marks the last session as a clean
+    exit, so Chromium shows no "restore pages?" bubble after the kiosk was
+    killed or lost power. A profile whose state files no longer parse is
+    treated as corrupted and wiped.
+
+    Args:
+        profile_dir (Path or str): Chromium --user-data-dir
+        log (callable): Logging function
+
+    Returns:
+        Path: The profile directory
+    """
+    profile_dir = Path(profile_dir)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+
+    for name in SINGLETON_FILES:
+        path = profile_dir / name
+        if path.is_symlink() or path.exists():
+            path.unlink()
+
+    local_state = profile_dir / 'Local State'
+    preferences = profile_dir / 'Default' / 'Preferences'
+    try:
+        if local_state.exists():
+            state = _load_json(local_state)
+            if state.get('exited_cleanly') is False:
+                state['exited_cleanly'] = True
+                _write_json(local_state, state)
+
+        if preferences.exists():
+            prefs = _load_json(preferences)
+            profile = prefs.setdefault('profile', {})
+            if profile.get('exit_type') != 'Normal' or not profile.get('exited_cleanly', True):
+                profile['exit_type'] = 'Normal'
+                profile['exited_cleanly'] = True
+                _write_json(preferences, prefs)
+    except (OSError, ValueError, AttributeError) as e:
+        log(f"[WARN] Browser profile is corrupted ({e}), starting with a fresh one")
+        reset_profile(profile_dir)
+        profile_dir.mkdir(parents=True, exist_ok=True)
+
+    return profile_dir
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Config Store - Cached, versioned access to config.json
+Serves the parsed config from memory until the file changes on disk, and
+saves it atomically (temp file + rename) under an exclusive file lock so
+concurrent writers never lose each other's updates
+
+Every save bumps "config_version" in the file. Together with a hash of the
+file contents it forms the config's ETag, which callers pass back as
+if_match to make sure they are editing the revision they loaded.
+"""
+
+import os
+import copy
+import json
+import fcntl
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+VERSION_KEY = 'config_version'
+
+
+class ConfigConflict(Exception):
+    """The config was changed by someone else since the caller loaded it"""
+
+
+class ConfigStore:
+    """
+    Cached, atomically written config file.
+
+    Reads re-parse the file only when its mtime, inode or size changed
+    (an atomic save always gives it a new inode). Writers in this process
+    are serialized by a lock, writers in other processes by flock() on
+    a "<config>.lock" file next to it; the config file itself cannot be
+    locked because every save replaces it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self._lock = threading.Lock()
+        self._config = None
+        self._etag = None
+        self._signature = None
+
+    def load(self):
+        """
+        Return the current config and its ETag.
+
+        Returns:
+            tuple: (copy of the config the caller may change, ETag string
+            without the HTTP quotes)
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If it is not valid JSON
+        """
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._config), self._etag
+
+    def etag(self):
+        """Return the current ETag without copying the config (for conditional requests)"""
+        with self._lock:
+            self._refresh()
+            return self._etag
+
+    def update(self, change, if_match=None):
+        """
+        Apply `change(config)` to the latest config and save it.
+
+        The file is re-read under the lock first, so changes made since the
+        caller last loaded it are kept.
+
+        Args:
+            change (callable): Changes the config dict in place
+            if_match (str or set): ETag(s) the change is based on, or None
+                to apply it to whatever is current
+
+        Returns:
+            tuple: (saved config, its new ETag)
+
+        Raises:
+            ConfigConflict: If if_match no longer matches the file
+        """
+        with self._lock, self._file_lock():
+            try:
+                self._refresh()
+                config = copy.deepcopy(self._config)
+            except FileNotFoundError:
+                config = {}
+            if isinstance(if_match, str):
+                if_match = {if_match}
+            if if_match is not None and self._etag not in if_match:
+                raise ConfigConflict("Configuration was changed by someone else; reload it and try again")
+
+            change(config)
+            config[VERSION_KEY] = int(config.get(VERSION_KEY) or 0) + 1
+            self._write(config)
+            self._refresh()
+            return copy.deepcopy(self._config), self._etag
+
+    def save(self, config, if_match=None):
+        """Replace the whole config (see update())"""
+        def replace(current):
+            version = current.get(VERSION_KEY)
+            current.clear()
+            current.update(config)
+            current[VERSION_KEY] = version
+
+        return self.update(replace, if_match=if_match)
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Re-read the file if it changed since it was cached (caller holds self._lock)"""
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            signature = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+            if signature == self._signature:
+                return
+            data = f.read()
+
+        config = json.loads(data)
+        if not isinstance(config, dict):
+            raise ValueError("config must be a JSON object")
+        self._config = config
+        self._etag = f"{config.get(VERSION_KEY, 0)}-{hashlib.sha256(data).hexdigest()[:12]}"
+        self._signature = signature
+
+    def _write(self, config):
+        """Write the file atomically, keeping its permissions"""
+        try:
+            mode = self.path.stat().st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f'.{self.path.name}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(config, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path):
+    """Return the shared ConfigStore for a config file"""
+    path = Path(path).resolve()
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ConfigStore(path)
+        return _stores[path]
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Config Watcher - Event-driven change detection for config.json
+Uses Linux inotify (via ctypes) with a polling fallback, and debounces
+bursts of saves so one edit from the web UI triggers a single reload
+"""
+
+import os
+import time
+import errno
+import ctypes
+import select
+import struct
+import threading
+from pathlib import Path
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Watch the directory, not the file: atomic writes replace the file's inode
+# (write temp file, rename over config.json), which a file watch would miss
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_ATTRIB
+
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _load_inotify():
+    """Return libc if it provides inotify, otherwise None"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def file_signature(path):
+    """Return (mtime_ns, inode, size) for a file, or None if it is missing"""
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+    except OSError:
+        return None
+
+
+class ConfigWatcher:
+    """
+    Watches a single file and calls `callback()` after it changes.
+
+    Changes are debounced: the callback runs once the file has been quiet
+    for `debounce` seconds, and at most `max_delay` seconds after the first
+    event of a burst. While nothing changes the inotify thread sleeps in
+    select() with no timeout, so an idle watcher never wakes up.
+
+    Given an asyncio event loop, start() watches on that loop instead of a
+    thread (the inotify descriptor is registered with loop.add_reader) and
+    the callback runs on the loop.
+    """
+
+    def __init__(self, path, callback, debounce=0.25, max_delay=1.0, poll_interval=1.0, log=print):
+        self.path = Path(path).resolve()
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.log = log
+        self.mode = None
+        self._signature = file_signature(self.path)
+        self._inotify_fd = None
+        self._stop_event = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = None
+        self._loop = None
+        self._timer = None  # pending debounce/poll callback in loop mode
+        self._pending_since = None
+        self._last_event = None
+
+    def start(self, loop=None):
+        """Start watching on an asyncio event loop, or in a background thread if none is given"""
+        libc = _load_inotify()
+        if libc is not None:
+            try:
+                self._inotify_fd = self._init_inotify(libc)
+                self.mode = 'inotify'
+            except OSError as e:
+                self.log(f"[WARN] inotify unavailable ({e}), polling config every {self.poll_interval}s")
+        if self._inotify_fd is None:
+            self.mode = 'polling'
+
+        if loop is not None:
+            self._loop = loop
+            if self.mode == 'inotify':
+                loop.add_reader(self._inotify_fd, self._on_inotify_readable)
+            else:
+                self._timer = loop.call_later(self.poll_interval, self._poll_on_loop)
+        else:
+            target = self._run_inotify if self.mode == 'inotify' else self._run_polling
+            self._thread = threading.Thread(target=target, name='config-watcher', daemon=True)
+            self._thread.start()
+        self.log(f"[INFO] Watching {self.path} ({self.mode})")
+
+    def stop(self):
+        """Stop watching and release the inotify descriptor (call on the loop in loop mode)"""
+        self._stop_event.set()
+        if self._loop is not None:
+            if self._timer:
+                self._timer.cancel()
+            if self._inotify_fd is not None:
+                self._loop.remove_reader(self._inotify_fd)
+        else:
+            os.write(self._wake_w, b'x')
+        if self._thread:
+            self._thread.join(timeout=2)
+        for fd in (self._inotify_fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._inotify_fd = None
+
+    def _init_inotify(self, libc):
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        wd = libc.inotify_add_watch(fd, os.fsencode(str(self.path.parent)), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, os.strerror(err))
+        return fd
+
+    def _read_events(self):
+        """Drain pending inotify events; return True if any concern the watched file"""
+        relevant = False
+        name = os.fsencode(self.path.name)
+        while True:
+            try:
+                data = os.read(self._inotify_fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return relevant
+                raise
+            offset = 0
+            while offset < len(data):
+                _wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                event_name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if event_name == name:
+                    relevant = True
+
+    def _run_inotify(self):
+        pending_since = None
+        last_event = None
+
+        while not self._stop_event.is_set():
+            # Block indefinitely while idle; only time out to end a debounce window
+            timeout = None
+            if pending_since is not None:
+                now = time.monotonic()
+                timeout = max(0, min(last_event + self.debounce, pending_since + self.max_delay) - now)
+
+            try:
+                readable, _, _ = select.select([self._inotify_fd, self._wake_r], [], [], timeout)
+            except (OSError, ValueError):
+                return  # descriptors closed by stop()
+
+            if self._wake_r in readable:
+                return
+
+            if self._inotify_fd in readable:
+                if self._read_events():
+                    last_event = time.monotonic()
+                    if pending_since is None:
+                        pending_since = last_event
+                continue
+
+            if pending_since is not None:
+                pending_since = None
+                self._fire_if_changed()
+
+    def _run_polling(self):
+        pending_since = None
+
+        while not self._stop_event.wait(self.debounce if pending_since else self.poll_interval):
+            signature = file_signature(self.path)
+            if signature != self._signature:
+                # Keep waiting while the file is still being written
+                self._signature = signature
+                if pending_since is None:
+                    pending_since = time.monotonic()
+                if time.monotonic() - pending_since < self.max_delay:
+                    continue
+            if pending_since is not None:
+                pending_since = None
+                self._notify()
+
+    def _on_inotify_readable(self):
+        try:
+            relevant = self._read_events()
+        except OSError as e:
+            self.log(f"[WARN] Failed to read config change events: {e}")
+            return
+        if not relevant:
+            return
+
+        self._last_event = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = self._last_event
+        if self._timer:
+            self._timer.cancel()
+        fire_at = min(self._last_event + self.debounce, self._pending_since + self.max_delay)
+        self._timer = self._loop.call_later(max(0, fire_at - time.monotonic()), self._end_burst)
+
+    def _end_burst(self):
+        self._timer = None
+        self._pending_since = None
+        self._fire_if_changed()
+
+    def _poll_on_loop(self):
+        signature = file_signature(self.path)
+        if signature != self._signature:
+            # Keep waiting while the file is still being written
+            self._signature = signature
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if time.monotonic() - self._pending_since < self.max_delay:
+                self._timer = self._loop.call_later(self.debounce, self._poll_on_loop)
+                return
+        if self._pending_since is not None:
+            self._pending_since = None
+            self._notify()
+        self._timer = self._loop.call_later(self.poll_interval, self._poll_on_loop)
+
+    def _fire_if_changed(self):
+        signature = file_signature(self.path)
+        if signature == self._signature:
+            return  # event without a content change (e.g. chmod)
+        self._signature = signature
+        self._notify()
+
+    def _notify(self):
+        if file_signature(self.path) is None:
+            return  # mid-replace or deleted; the next event will bring it back
+        try:
+            self.callback()
+        except Exception as e:
+            self.log(f"[ERROR] Config change handler failed: {e}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Control Socket - Live command channel between web manager and controller
+Newline-delimited JSON over a local Unix socket, so operator actions reach
+the running controller in milliseconds instead of through systemctl
+
+A request is one JSON object per line, e.g. {"command": "show", "index": 2},
+answered by one line {"success": true, "message": "...", ...}. Commands are
+defined by the controller (see KioskController.handle_command).
+"""
+
+import os
+import json
+import socket
+import asyncio
+from pathlib import Path
+
+DEFAULT_CONTROL_SOCKET = Path.home() / '.cache' / 'kiosk-control.sock'
+CLIENT_TIMEOUT = 5
+
+
+class ControlServer:
+    """
+    Serves control commands on a Unix socket from an asyncio event loop.
+
+    `handler(request)` is a coroutine taking the request dict and returning
+    the response dict; it runs on the loop. A ValueError from the handler
+    is reported to the client as a failed command.
+    """
+
+    def __init__(self, path, handler, log=print):
+        self.path = Path(path)
+        self.handler = handler
+        self.log = log
+        self._server = None
+
+    async def start(self):
+        """Start listening (replaces a socket file left by a previous run)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.is_socket():
+            self.path.unlink()
+        self._server = await asyncio.start_unix_server(self._serve_client, path=str(self.path))
+        # Same user only: the web manager runs as the kiosk user too
+        os.chmod(self.path, 0o600)
+        self.log(f"[INFO] Control socket listening on {self.path}")
+
+    async def stop(self):
+        """Stop listening and remove the socket file"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self._handle(line)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict) or not isinstance(request.get('command'), str):
+                raise ValueError("Request must be a JSON object with a command")
+            return await self.handler(request)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            self.log(f"[ERROR] Control command failed: {e}")
+            return {"success": False, "message": f"Command failed: {e}"}
+
+
+def send_command(command, path=DEFAULT_CONTROL_SOCKET, timeout=CLIENT_TIMEOUT, **args):
+    """
+    Send one command to the running controller and return its response.
+
+    Args:
+        command (str): Command name, e.g. 'state' or 'show'
+        path (Path or str): Control socket path
+        timeout (float): Seconds to wait for the controller
+        **args: Command arguments, e.g. index=2
+
+    Returns:
+        dict: The response ({"success", "message", ...})
+
+    Raises:
+        OSError: If the controller is not running or does not answer
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        sock.sendall(json.dumps(dict(args, command=command)).encode() + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+
+    if not line:
+        raise ConnectionError("Controller closed the control socket")
+    return json.loads(line)
@@ -4,8 +4,8 @@ Convert file:// URLs in config.json to http://localhost:5000/html/ URLs
 This allows HTML files to be served via HTTP instead of blocked file:// protocol
 """
 
-import json
 from pathlib import Path
+from config_store import get_store
 
 CONFIG_FILE = Path('/home/annkiosk/announcements_kiosk/pipiosk_v1/config.json')
 
@@ -17,8 +17,8 @@ def convert_urls():
     """Convert all file:// URLs to http://localhost:5000/html/ URLs"""
     try:
         # Load config
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
+        store = get_store(CONFIG_FILE)
+        config, etag = store.load()
         
         updated = False
         new_urls = []
@@ -40,9 +40,8 @@ def convert_urls():
             # Update config
             config['urls'] = new_urls
             
-            # Save config
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(config, f, indent=2)
+            # Save config (fails rather than overwrite a change made in the meantime)
+            store.save(config, if_match=etag)
             
             print(f"\n✓ Updated {CONFIG_FILE}")
             print(f"✓ Converted {len([u for u in new_urls if 'localhost' in u])} file:// URLs to http://")
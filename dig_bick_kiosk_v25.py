@@ -6,10 +6,12 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
+from config_watcher import ConfigWatcher
 
 CONFIG_FILE = '/home/annkiosk/announcements_kiosk/pipiosk_v1/config.json'
 CHROMEDRIVER_PATH = "/usr/bin/chromedriver"
 CHROMIUM_BINARY   = "/usr/bin/chromium-browser"
+TAB_LOAD_TIMEOUT = 30
 
 class KioskController:
     def __init__(self):
@@ -58,6 +60,19 @@ class KioskController:
             self.log(f"[ERROR] Error loading config: {e}")
             raise
 
+    def on_config_changed(self):
+        """Reload config.json when the watcher reports a change."""
+        old_urls = self.urls[:]
+        try:
+            self.load_config()
+        except Exception:
+            return  # load_config already logged it; keep running with the old config
+
+        if self.urls != old_urls:
+            # This controller cannot update tabs in place, so exit and let systemd restart it
+            self.log("[INFO] URLs changed in config, stopping kiosk for restart.")
+            self.stop_event.set()
+
     def create_driver(self):
         self.log("[INFO] Creating Chrome driver (Chromium)...")
 
@@ -104,24 +119,36 @@ class KioskController:
         self.driver.get(self.urls[0])
         self.log(f"[INFO] Opened initial URL in first tab: {self.urls[0]}")
 
+        start = time.monotonic()
         for url in self.urls[1:]:
             self.driver.execute_script(f"window.open('{url}', '_blank');")
             self.log(f"[INFO] Opened new tab with URL: {url}")
 
-        time.sleep(5)
-
         handles = self.driver.window_handles
         self.log(f"[INFO] There are {len(handles)} browser tabs open.")
 
+        # The tabs load in parallel; visit each one until it has finished loading
         for index, handle in enumerate(handles):
             self.driver.switch_to.window(handle)
-            self.log(f"[INFO] Switched to tab {index + 1}/{len(handles)}.")
-            time.sleep(3)
+            if self.wait_for_load(start + TAB_LOAD_TIMEOUT):
+                self.log(f"[INFO] Tab {index + 1}/{len(handles)} ready after {time.monotonic() - start:.1f}s.")
+            else:
+                self.log(f"[WARN] Tab {index + 1}/{len(handles)} still loading after {TAB_LOAD_TIMEOUT}s.")
 
         self.driver.switch_to.window(handles[0])
         self.current_tab = 0
         self.log(f"[INFO] Reset focus to the first tab.")
 
+    def wait_for_load(self, deadline):
+        while time.monotonic() < deadline:
+            try:
+                if self.driver.execute_script("return document.readyState;") == 'complete':
+                    return True
+            except Exception:
+                pass  # page is mid-navigation
+            time.sleep(0.25)
+        return False
+
     def click_signin_buttons(self):
         try:
             signin_buttons = self.driver.find_elements(By.XPATH, "//a[contains(text(), 'Sign in')]")
@@ -179,10 +206,14 @@ class KioskController:
 
         threading.Thread(target=self.cycle_tabs, daemon=True).start()
 
+        watcher = ConfigWatcher(CONFIG_FILE, self.on_config_changed, log=self.log)
+        watcher.start()
+
         try:
             while not self.stop_event.is_set():
                 time.sleep(1)
         finally:
+            watcher.stop()
             if self.driver:
                 self.driver.quit()
             self.log("[INFO] Kiosk Controller exited.")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Event Hub - Shared state broadcast for the dashboard's Server-Sent Events
+One background watcher samples the kiosk's state for all connected
+dashboards, so the cost of a tick does not grow with the number of clients
+"""
+
+import threading
+import time
+
+KEEPALIVE_SECONDS = 15
+STREAM_SECONDS = 300
+
+
+class EventHub:
+    """
+    Latest-value broadcast of named topics to any number of subscribers.
+
+    `sources` maps a topic name to a function returning its current value.
+    While at least one client is subscribed, a single watcher thread calls
+    every source each `interval` seconds and publishes the values that
+    changed; once the last client leaves the thread exits. Clients only
+    need the newest value of each topic, so a slow client skips values
+    instead of queueing them.
+    """
+
+    def __init__(self, sources, interval=2.0, log=print):
+        self.sources = sources
+        self.interval = interval
+        self.log = log
+        self._values = {}  # topic -> (sequence number, value)
+        self._sequence = 0
+        self._subscribers = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._failing = set()  # topics whose source failed last tick (logged once)
+
+    def publish(self, topic, value):
+        """Set a topic's value, waking subscribers if it changed (safe to call from any thread)"""
+        with self._condition:
+            current = self._values.get(topic)
+            if current is not None and current[1] == value:
+                return
+            self._sequence += 1
+            self._values[topic] = (self._sequence, value)
+            self._condition.notify_all()
+
+    def close(self):
+        """End every subscription, e.g. when the server shuts down; the watcher stops with them"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def subscribe(self, limit=None, lifetime=STREAM_SECONDS, keepalive=KEEPALIVE_SECONDS):
+        """
+        Open a subscription: an iterable of (topic, value) pairs, the
+        current value of every topic first, then each change as it is
+        published.
+
+        It yields (None, None) after `keepalive` seconds without a change,
+        so the caller can keep the connection open (and notice when it has
+        been closed), and ends after `lifetime` seconds or when the hub is
+        closed. Each subscription holds a server thread, so they are
+        bounded: the caller reconnects when one ends.
+
+        Returns:
+            Subscription, or None if `limit` subscriptions are already open
+            or the hub is closed. Call its close() when done with it.
+        """
+        with self._condition:
+            if self._closed or (limit is not None and self._subscribers >= limit):
+                return None
+            self._subscribers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name='event-hub', daemon=True)
+                self._thread.start()
+        return Subscription(self, lifetime, keepalive)
+
+    def _watch(self):
+        while True:
+            with self._condition:
+                if not self._subscribers:
+                    # Nobody is listening; forget values that would be stale for the next client
+                    self._values = {}
+                    self._thread = None
+                    return
+
+            for topic, source in self.sources.items():
+                try:
+                    value = source()
+                except Exception as e:
+                    if topic not in self._failing:
+                        self.log(f"[WARN] Event source {topic} failed: {e}")
+                        self._failing.add(topic)
+                    continue
+                self._failing.discard(topic)
+                self.publish(topic, value)
+
+            time.sleep(self.interval)
+
+
+class Subscription:
+    """One client's view of an EventHub (see EventHub.subscribe)"""
+
+    def __init__(self, hub, lifetime, keepalive):
+        self.hub = hub
+        self.keepalive = keepalive
+        self.deadline = time.monotonic() + lifetime
+        self._open = True
+
+    def __iter__(self):
+        hub = self.hub
+        seen = 0
+        try:
+            while self._open:
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                with hub._condition:
+                    if hub._sequence == seen:
+                        hub._condition.wait(min(self.keepalive, remaining))
+                    if hub._closed:
+                        return
+                    changed = [(topic, value) for topic, (sequence, value) in hub._values.items()
+                               if sequence > seen]
+                    seen = hub._sequence
+
+                if not changed:
+                    yield None, None
+                for topic, value in changed:
+                    yield topic, value
+        finally:
+            self.close()
+
+    def close(self):
+        """Give up the subscription's place (safe to call more than once)"""
+        with self.hub._condition:
+            if self._open:
+                self._open = False
+                self.hub._subscribers -= 1
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Gunicorn Config - Production server settings for the web manager
+Used by kiosk-web.service: gunicorn --config gunicorn.conf.py web_manager:app
+
+Threaded workers serve each request on its own thread, so a slow upload
+does not hold up the kiosk tabs fetching /html/ and /pdfs/. Requests that
+hold a thread for long are bounded by the app itself: log long-polls wait
+at most 10s, and dashboard event streams are limited in number
+(max_event_streams) and end after 5 minutes. Settings come from the
+"web_server" object in config.json (see README.md); these are the defaults.
+"""
+
+import signal
+
+from html_generator import CONFIG_FILE
+from config_store import get_store
+
+DEFAULTS = {
+    'bind': '0.0.0.0:5000',
+    # Extra processes each keep their own event watcher, log follower and
+    # PDF render status, so scale with threads first
+    'workers': 1,
+    'threads': 16,
+    'keepalive': 5,
+    'timeout': 60,
+    'graceful_timeout': 20
+}
+
+try:
+    _settings = get_store(CONFIG_FILE).load()[0].get('web_server') or {}
+except (OSError, ValueError):
+    _settings = {}
+_settings = dict(DEFAULTS, **_settings)
+
+bind = _settings['bind']
+worker_class = 'gthread'
+workers = int(_settings['workers'])
+threads = int(_settings['threads'])
+# Seconds an idle keep-alive connection stays open
+keepalive = int(_settings['keepalive'])
+# Seconds a worker's main loop may be unresponsive before it is restarted
+# (a heartbeat; threaded workers have no per-request timeout)
+timeout = int(_settings['timeout'])
+# Seconds requests get to finish after SIGTERM before workers are killed
+graceful_timeout = int(_settings['graceful_timeout'])
+
+# Keep request lines and headers small; uploads are limited by MAX_CONTENT_LENGTH
+limit_request_line = 8190
+limit_request_fields = 100
+
+accesslog = None
+errorlog = '-'
+loglevel = 'info'
+
+
+def post_worker_init(worker):
+    """On SIGTERM, end the dashboards' event streams so the worker can stop without waiting them out"""
+    import web_manager
+    handle_exit = worker.handle_exit
+
+    def shut_down(signum, frame):
+        web_manager.event_hub.close()
+        handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, shut_down)
+
+
+def worker_exit(server, worker):
+    """End the worker's journalctl follower along with it"""
+    import web_manager
+    web_manager.journal_follower.stop()
@@ -5,8 +5,9 @@ Generates HTML files for Smartsheet embeds and PDF viewers
 """
 
 import os
-import json
+import hashlib
 from pathlib import Path
+from config_store import get_store
 
 # Default paths
 HTML_OUTPUT_DIR = Path('/home/annkiosk/announcements_kiosk/html')
@@ -17,6 +18,49 @@ if not CONFIG_FILE.exists():
     HTML_OUTPUT_DIR = Path('./html')
     CONFIG_FILE = Path('./config.json')
 
+# PDF.js build vendored by vendor_pdfjs.sh and served by the web manager
+PDFJS_VERSION = '3.11.174'
+PDFJS_DIR = Path(__file__).resolve().parent / 'static' / 'pdfjs'
+PDFJS_CDN_BASE = f'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/{PDFJS_VERSION}'
+
+_asset_digests = {}
+
+
+def asset_digest(path):
+    """
+    Return a short content hash for a static asset.
+    
+    Digests are cached by mtime and size so repeated page generation
+    and requests do not re-hash the file.
+    """
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _asset_digests:
+        with open(path, 'rb') as f:
+            _asset_digests[key] = hashlib.sha256(f.read()).hexdigest()[:16]
+    return _asset_digests[key]
+
+
+def pdfjs_url(filename):
+    """
+    Return the URL a generated viewer should load a PDF.js file from.
+    
+    Uses the immutable, content-hashed web manager URL when PDF.js has been
+    vendored, and falls back to the CDN otherwise.
+    
+    Args:
+        filename (str): 'pdf.min.js' or 'pdf.worker.min.js'
+        
+    Returns:
+        str: URL of the script
+    """
+    vendored = PDFJS_DIR / filename
+    if vendored.exists():
+        return f'http://localhost:5000/vendor/pdfjs/{asset_digest(vendored)}/{filename}'
+    
+    print(f"⚠ PDF.js not vendored ({vendored} missing), using CDN. Run ./vendor_pdfjs.sh")
+    return f'{PDFJS_CDN_BASE}/{filename}'
+
 
 def generate_smartsheet_html(title, smartsheet_url, output_filename=None, zoom=1.0):
     """
@@ -241,7 +285,7 @@ def generate_smartsheet_html(title, smartsheet_url, output_filename=None, zoom=1
     return output_path
 
 
-def generate_pdf_html(title, pdf_path, output_filename=None, scroll_speed=50):
+def generate_pdf_html(title, pdf_path, output_filename=None, scroll_speed=50, image_mode=True):
     """
     Generate an HTML file for displaying a PDF with dual-page view and auto-scroll.
     
@@ -250,6 +294,8 @@ def generate_pdf_html(title, pdf_path, output_filename=None, scroll_speed=50):
         pdf_path (str): Path to the PDF file (can be local file:// or URL)
         output_filename (str): Optional custom filename (without .html extension)
         scroll_speed (int): Pixels per second to scroll (default: 50)
+        image_mode (bool): Show pre-rendered page images when the web manager
+            has rasterized the PDF, falling back to PDF.js otherwise (default: True)
         
     Returns:
         Path: Path to the generated HTML file
@@ -270,6 +316,12 @@ def generate_pdf_html(title, pdf_path, output_filename=None, scroll_speed=50):
         pdf_path = f'http://localhost:5000/pdfs/{pdf_filename}'
     
     print(f"PDF path conversion: {original_path} -> {pdf_path}")
+    
+    # Pre-rendered page images live in "<name>_pages/" next to PDFs served by the web manager
+    pages_url = ''
+    if image_mode and pdf_path.startswith('http://localhost:5000/pdfs/'):
+        pages_url = pdf_path.rsplit('.', 1)[0] + '_pages/'
+    
     if output_filename is None:
         # Generate filename from title
         output_filename = title.lower().replace(' ', '_').replace('-', '_') + '_pdf'
@@ -278,13 +330,16 @@ def generate_pdf_html(title, pdf_path, output_filename=None, scroll_speed=50):
     if not output_filename.endswith('.html'):
         output_filename += '.html'
     
+    pdfjs_script_url = pdfjs_url('pdf.min.js')
+    pdfjs_worker_url = pdfjs_url('pdf.worker.min.js')
+    
     html_content = f'''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{title}</title>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/pdf.js/3.11.174/pdf.min.js"></script>
+    <script src="{pdfjs_script_url}"></script>
     <style>
         * {{
             margin: 0;
@@ -335,11 +390,20 @@ def generate_pdf_html(title, pdf_path, output_filename=None, scroll_speed=50):
             justify-content: center;
         }}
 
-        .page-canvas {{
+        .page-slot, .page-image {{
             background: white;
             box-shadow: 0 4px 8px rgba(0,0,0,0.3);
         }}
 
+        .page-canvas {{
+            display: block;
+        }}
+
+        .pair-image {{
+            /* Pair images have a transparent gap, so shadow the pages rather than the box */
+            filter: drop-shadow(0 4px 4px rgba(0,0,0,0.3));
+        }}
+
         .controls {{
             position: fixed;
             bottom: 20px;
@@ -395,32 +459,67 @@ def generate_pdf_html(title, pdf_path, output_filename=None, scroll_speed=50):
     <script>
         const PDF_URL = '{pdf_path}';
         const SCROLL_SPEED = {scroll_speed}; // pixels per second
+        const PAGES_URL = '{pages_url}'; // pre-rendered page images ('' = PDF.js only)
         
-        let pdfDoc = null;
+        let pdfDocPromise = null;
         let totalPages = 0;
         let isAutoScrolling = false;
         let scrollInterval = null;
         
+        // Virtualized rendering: only page pairs near the viewport hold a canvas
+        const RENDER_SCALE = 1.0;           // reduced for faster rendering on Raspberry Pi
+        const RENDER_MARGIN = '150% 0px';   // render pairs within 1.5 screens of the viewport
+        const RELEASE_MARGIN = '300% 0px';  // release canvases more than 3 screens away
+        const CANVAS_POOL_SIZE = 6;         // released canvases kept for reuse
+        let pageSize = null;
+        let renderObserver = null;
+        let releaseObserver = null;
+        let renderQueue = [];
+        let isRendering = false;
+        let canvasPool = [];
+        
+        // Rendered pages persist across tab refreshes in the Cache API, keyed by
+        // the PDF's ETag so a changed PDF never repaints stale pages
+        const PAGE_CACHE_PREFIX = `pdf-pages:${{PDF_URL}}:`;
+        let pageCache = null;
+        let cachedLayout = null;
+        
         // Set up PDF.js worker
-        pdfjsLib.GlobalWorkerOptions.workerSrc = 'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/3.11.174/pdf.worker.min.js';
+        pdfjsLib.GlobalWorkerOptions.workerSrc = '{pdfjs_worker_url}';
 
         async function loadPDF() {{
             try {{
-                console.log('Loading PDF from:', PDF_URL);
-                pdfDoc = await pdfjsLib.getDocument(PDF_URL).promise;
-                totalPages = pdfDoc.numPages;
-                
-                console.log(`PDF loaded: ${{totalPages}} pages`);
+                // Image mode: the server has already rendered every page
+                const manifest = await loadPageImages();
+                if (manifest) {{
+                    console.log(`Using ${{manifest.page_count}} pre-rendered pages from:`, PAGES_URL);
+                    renderImagePages(manifest);
+                    showPages();
+                    return;
+                }}
                 
-                await renderAllPages();
+                await openPageCache();
                 
-                document.getElementById('loading').style.display = 'none';
-                document.getElementById('pdfContainer').style.display = 'flex';
+                if (cachedLayout) {{
+                    // Unchanged PDF: repaint from cache without fetching or parsing it
+                    totalPages = cachedLayout.numPages;
+                    pageSize = cachedLayout.pageSize;
+                    console.log(`Repainting ${{totalPages}} pages from cache`);
+                }} else {{
+                    const pdfDoc = await getPdfDoc();
+                    totalPages = pdfDoc.numPages;
+                    console.log(`PDF loaded: ${{totalPages}} pages`);
+                    
+                    // Size every placeholder from page 1 so the scroll height is right
+                    // before anything is rendered; slots are corrected as pages render
+                    const firstPage = await pdfDoc.getPage(1);
+                    const viewport = firstPage.getViewport({{ scale: RENDER_SCALE }});
+                    pageSize = {{ width: viewport.width, height: viewport.height }};
+                    storeCachedLayout();
+                }}
                 
-                // Start auto-scrolling after a short delay
-                setTimeout(() => {{
-                    startAutoScroll();
-                }}, 2000);
+                buildPageLayout();
+                showPages();
                 
             }} catch (error) {{
                 console.error('Error loading PDF:', error);
@@ -438,62 +537,276 @@ def generate_pdf_html(title, pdf_path, output_filename=None, scroll_speed=50):
             }}
         }}
 
-        async function renderAllPages() {{
+        function showPages() {{
+            document.getElementById('loading').style.display = 'none';
+            document.getElementById('pdfContainer').style.display = 'flex';
+            updatePageInfo();
+            
+            // Start auto-scrolling after a short delay
+            setTimeout(() => {{
+                startAutoScroll();
+            }}, 2000);
+        }}
+
+        async function loadPageImages() {{
+            if (!PAGES_URL) return null;
+            
+            try {{
+                const response = await fetch(PAGES_URL + 'manifest.json', {{ cache: 'no-cache' }});
+                if (!response.ok) return null;
+                return await response.json();
+            }} catch (error) {{
+                console.log('No pre-rendered pages, using PDF.js:', error.message);
+                return null;
+            }}
+        }}
+
+        function renderImagePages(manifest) {{
+            const wrapper = document.getElementById('pagesWrapper');
+            totalPages = manifest.page_count;
+            
+            if (manifest.pairs && manifest.pairs.length) {{
+                // One composited image per page pair
+                manifest.pairs.forEach(pair => {{
+                    const pairDiv = document.createElement('div');
+                    pairDiv.className = 'page-pair';
+                    pairDiv.appendChild(createPageImage(pair, 'pair-image'));
+                    wrapper.appendChild(pairDiv);
+                }});
+            }} else {{
+                for (let i = 0; i < manifest.pages.length; i += 2) {{
+                    const pairDiv = document.createElement('div');
+                    pairDiv.className = 'page-pair';
+                    pairDiv.appendChild(createPageImage(manifest.pages[i], 'page-image'));
+                    if (i + 1 < manifest.pages.length) {{
+                        pairDiv.appendChild(createPageImage(manifest.pages[i + 1], 'page-image'));
+                    }}
+                    wrapper.appendChild(pairDiv);
+                }}
+            }}
+        }}
+
+        function createPageImage(entry, className) {{
+            const img = document.createElement('img');
+            img.className = className;
+            img.decoding = 'async';
+            // Reserve the final size up front so the scroll height never jumps
+            if (entry.width && entry.height) {{
+                img.width = entry.width;
+                img.height = entry.height;
+            }}
+            img.src = PAGES_URL + entry.file;
+            return img;
+        }}
+
+        function getPdfDoc() {{
+            // Loaded on first use only - a fully cached PDF never needs PDF.js
+            if (!pdfDocPromise) {{
+                console.log('Loading PDF from:', PDF_URL);
+                pdfDocPromise = pdfjsLib.getDocument(PDF_URL).promise;
+            }}
+            return pdfDocPromise;
+        }}
+
+        async function openPageCache() {{
+            if (!('caches' in window)) return;
+            
+            try {{
+                // A cheap revalidation tells us whether the PDF changed since it was cached
+                const response = await fetch(PDF_URL, {{ method: 'HEAD', cache: 'no-cache' }});
+                const version = response.headers.get('ETag') || [
+                    response.headers.get('Last-Modified'),
+                    response.headers.get('Content-Length')
+                ].filter(Boolean).join('/');
+                if (!response.ok || !version) return;
+                
+                const cacheName = PAGE_CACHE_PREFIX + version;
+                
+                // Drop pages cached for older versions of this PDF
+                for (const name of await caches.keys()) {{
+                    if (name.startsWith(PAGE_CACHE_PREFIX) && name !== cacheName) {{
+                        await caches.delete(name);
+                    }}
+                }}
+                
+                pageCache = await caches.open(cacheName);
+                const layout = await pageCache.match(pageCacheKey('layout'));
+                if (layout) {{
+                    cachedLayout = await layout.json();
+                }}
+            }} catch (error) {{
+                console.log('Page cache unavailable:', error.message);
+                pageCache = null;
+            }}
+        }}
+
+        function pageCacheKey(name) {{
+            return `${{location.origin}}/__pdf_page_cache__/${{RENDER_SCALE}}/${{name}}`;
+        }}
+
+        function storeCachedLayout() {{
+            if (!pageCache) return;
+            
+            const layout = JSON.stringify({{ numPages: totalPages, pageSize: pageSize }});
+            pageCache.put(pageCacheKey('layout'), new Response(layout, {{
+                headers: {{ 'Content-Type': 'application/json' }}
+            }})).catch(error => console.log('Could not cache layout:', error.message));
+        }}
+
+        function storeCachedPage(pageNum, canvas) {{
+            if (!pageCache) return;
+            
+            // toBlob snapshots the canvas now, so it is safe to recycle it afterwards
+            canvas.toBlob(blob => {{
+                if (!blob) return;
+                pageCache.put(pageCacheKey(`page-${{pageNum}}`), new Response(blob, {{
+                    headers: {{ 'Content-Type': blob.type }}
+                }})).catch(error => console.log('Could not cache page:', error.message));
+            }}, 'image/webp', 0.9);
+        }}
+
+        async function drawCachedPage(pageNum) {{
+            if (!pageCache) return null;
+            
+            try {{
+                const response = await pageCache.match(pageCacheKey(`page-${{pageNum}}`));
+                if (!response) return null;
+                
+                const bitmap = await createImageBitmap(await response.blob());
+                const canvas = acquireCanvas(bitmap.width, bitmap.height);
+                canvas.getContext('2d').drawImage(bitmap, 0, 0);
+                bitmap.close();
+                return canvas;
+            }} catch (error) {{
+                return null;
+            }}
+        }}
+
+        async function drawPdfPage(pageNum) {{
+            const pdfDoc = await getPdfDoc();
+            const page = await pdfDoc.getPage(pageNum);
+            const viewport = page.getViewport({{ scale: RENDER_SCALE }});
+            
+            const canvas = acquireCanvas(viewport.width, viewport.height);
+            await page.render({{
+                canvasContext: canvas.getContext('2d'),
+                viewport: viewport
+            }}).promise;
+            page.cleanup();
+            
+            storeCachedPage(pageNum, canvas);
+            return canvas;
+        }}
+
+        function buildPageLayout() {{
             const wrapper = document.getElementById('pagesWrapper');
+            const container = document.getElementById('pdfContainer');
+            
+            renderObserver = new IntersectionObserver(entries => {{
+                entries.forEach(entry => {{
+                    if (entry.isIntersecting) queuePairRender(entry.target);
+                }});
+            }}, {{ root: container, rootMargin: RENDER_MARGIN }});
             
-            // Show loading progress
-            document.getElementById('loading').textContent = 'Rendering pages...';
-            document.getElementById('loading').style.display = 'block';
+            releaseObserver = new IntersectionObserver(entries => {{
+                entries.forEach(entry => {{
+                    if (!entry.isIntersecting) releasePair(entry.target);
+                }});
+            }}, {{ root: container, rootMargin: RELEASE_MARGIN }});
             
-            // Render pages in pairs with progress updates
             for (let pageNum = 1; pageNum <= totalPages; pageNum += 2) {{
                 const pairDiv = document.createElement('div');
                 pairDiv.className = 'page-pair';
                 
-                // Update progress
-                document.getElementById('loading').textContent = 
-                    `Rendering page ${{pageNum}} of ${{totalPages}}...`;
-                
-                // Render left page
-                const canvas1 = await renderPage(pageNum);
-                pairDiv.appendChild(canvas1);
-                
-                // Render right page if it exists
+                pairDiv.appendChild(createPageSlot(pageNum));
                 if (pageNum + 1 <= totalPages) {{
-                    const canvas2 = await renderPage(pageNum + 1);
-                    pairDiv.appendChild(canvas2);
+                    pairDiv.appendChild(createPageSlot(pageNum + 1));
                 }}
                 
                 wrapper.appendChild(pairDiv);
-                
-                // Allow UI to update between page renders
-                await new Promise(resolve => setTimeout(resolve, 10));
+                renderObserver.observe(pairDiv);
+                releaseObserver.observe(pairDiv);
             }}
+        }}
+
+        function createPageSlot(pageNum) {{
+            const slot = document.createElement('div');
+            slot.className = 'page-slot';
+            slot.dataset.page = pageNum;
+            slot.style.width = `${{pageSize.width}}px`;
+            slot.style.height = `${{pageSize.height}}px`;
+            return slot;
+        }}
+
+        function queuePairRender(pairDiv) {{
+            if (pairDiv.dataset.state) return; // already queued or rendered
             
-            document.getElementById('loading').style.display = 'none';
-            updatePageInfo();
+            pairDiv.dataset.state = 'queued';
+            renderQueue.push(pairDiv);
+            drainRenderQueue();
         }}
 
-        async function renderPage(pageNum) {{
-            const page = await pdfDoc.getPage(pageNum);
-            // Reduced scale for faster rendering on Raspberry Pi (1.0 instead of 1.5)
-            const viewport = page.getViewport({{ scale: 1.0 }});
+        async function drainRenderQueue() {{
+            if (isRendering) return;
+            isRendering = true;
             
-            const canvas = document.createElement('canvas');
-            canvas.className = 'page-canvas';
-            const context = canvas.getContext('2d');
+            // One page at a time keeps the Pi responsive while scrolling
+            while (renderQueue.length) {{
+                const pairDiv = renderQueue.shift();
+                if (pairDiv.dataset.state !== 'queued') continue; // released before its turn
+                
+                for (const slot of pairDiv.children) {{
+                    await renderPageInto(slot, pairDiv);
+                }}
+                if (pairDiv.dataset.state === 'queued') {{
+                    pairDiv.dataset.state = 'rendered';
+                }}
+            }}
             
-            canvas.height = viewport.height;
-            canvas.width = viewport.width;
+            isRendering = false;
+        }}
+
+        async function renderPageInto(slot, pairDiv) {{
+            const pageNum = Number(slot.dataset.page);
+            const canvas = await drawCachedPage(pageNum) || await drawPdfPage(pageNum);
             
-            await page.render({{
-                canvasContext: context,
-                viewport: viewport
-            }}).promise;
+            // The pair may have scrolled out of range while rendering
+            if (pairDiv.dataset.state !== 'queued') {{
+                releaseCanvas(canvas);
+                return;
+            }}
             
+            slot.style.width = `${{canvas.width}}px`;
+            slot.style.height = `${{canvas.height}}px`;
+            slot.appendChild(canvas);
+        }}
+
+        function releasePair(pairDiv) {{
+            if (!pairDiv.dataset.state) return;
+            
+            delete pairDiv.dataset.state;
+            pairDiv.querySelectorAll('canvas').forEach(releaseCanvas);
+        }}
+
+        function acquireCanvas(width, height) {{
+            const canvas = canvasPool.pop() || document.createElement('canvas');
+            canvas.className = 'page-canvas';
+            canvas.width = width;
+            canvas.height = height;
             return canvas;
         }}
 
+        function releaseCanvas(canvas) {{
+            canvas.remove();
+            if (canvasPool.length < CANVAS_POOL_SIZE) {{
+                canvasPool.push(canvas);
+            }} else {{
+                // Shrinking the canvas frees its backing store immediately
+                canvas.width = 0;
+                canvas.height = 0;
+            }}
+        }}
+
         function startAutoScroll() {{
             if (isAutoScrolling) return;
             
@@ -583,22 +896,15 @@ def add_to_config(file_path, position=None):
         # Convert to file:// URL
         file_url = f"file://{file_path}"
         
-        # Load config
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-        
-        # Add URL
-        if 'urls' not in config:
-            config['urls'] = []
-        
-        if position is not None:
-            config['urls'].insert(position, file_url)
-        else:
-            config['urls'].append(file_url)
+        def add_url(config):
+            urls = config.setdefault('urls', [])
+            if position is not None:
+                urls.insert(position, file_url)
+            else:
+                urls.append(file_url)
         
-        # Save config
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
+        # Re-read and save under the config lock so concurrent edits are kept
+        get_store(CONFIG_FILE).update(add_url)
         
         print(f"✓ Added to config: {file_url}")
         return True
@@ -6,54 +6,203 @@ Cycles through configured URLs in Chromium browser for Raspberry Pi kiosk displa
 
 import time
 import json
+import asyncio
 import threading
 import signal
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+from refresh_policy import RefreshTracker
+from playlist_schedule import PlaylistSchedule
+from config_watcher import ConfigWatcher
+from browser_backends import create_backend, BACKENDS, DEFAULT_CDP_PORT
+from chromium_profile import reset_profile, DEFAULT_PROFILE_DIR, DEFAULT_DISK_CACHE_MB
+from resource_governor import ProcessSampler, TAB_MEMORY_EXPRESSION
+from tab_health import probe_tab, CircuitBreaker, HEALTHY, NETWORK_ERROR
+from control_socket import ControlServer, DEFAULT_CONTROL_SOCKET
 
 # Configuration paths
 CONFIG_FILE = Path('/home/annkiosk/announcements_kiosk/pipiosk_v1/config.json')
-CHROMEDRIVER_PATH = "/usr/bin/chromedriver"
-CHROMIUM_BINARY = "/usr/bin/chromium-browser"
 
 # For development/testing in codespace
 if not CONFIG_FILE.exists():
     CONFIG_FILE = Path('./config.json')
 
+# Readiness check: page loaded and no new resource requests between two polls
+READY_EXPRESSION = "[document.readyState, performance.getEntriesByType('resource').length]"
+READY_POLL_INTERVAL = 0.25
+DEFAULT_LOAD_TIMEOUT = 30  # per-URL override: url_settings[url]["load_timeout"]
+
+# Page load time in seconds, measured by the browser for the last navigation
+LOAD_TIME_EXPRESSION = "((performance.getEntriesByType('navigation')[0] || {}).duration || 0) / 1000"
+
+# With a bounded tab pool, pages slower to load than this are evicted last
+EXPENSIVE_LOAD_SECONDS = 5
+
+# Shell display mode: one tab running the web manager's playlist page
+DISPLAY_MODES = ('tabs', 'shell')
+DEFAULT_SHELL_URL = 'http://localhost:5000/shell'
+SHELL_STATE_EXPRESSION = "window.kioskShell ? [window.kioskShell.heartbeat, window.kioskShell.current] : null"
+SHELL_CHECK_INTERVAL = 5
+SHELL_MAX_MISSED_CHECKS = 3  # reload the shell after this many checks without a heartbeat
+
+# Resource governor: samples over memory_budget_mb that reload a tab before the browser is restarted
+GOVERNOR_RELOAD_ATTEMPTS = 3
+
 
 class KioskController:
     """
     Main controller for the kiosk display system.
     Manages browser lifecycle, tab cycling, and configuration reloading.
+    
+    Tabs are tracked in self.tab_handles, parallel to self.urls, so config
+    changes can be applied by opening and closing individual tabs. With
+    max_live_tabs set, only that many tabs stay loaded: other entries are
+    None and are loaded on demand into a recycled tab. In shell display
+    mode a single tab runs the web manager's /shell page, which plays the
+    playlist itself, and the controller only watches it. The
+    browser itself is driven through a backend from browser_backends
+    (Selenium/chromedriver by default, or CDP directly).
+    
+    Everything runs on one asyncio event loop: the cycling (or shell
+    watching) duty, the resource governor and the config watcher are tasks
+    and timers on it, so nothing wakes up between deadlines. Backends are
+    blocking and not thread-safe, so every browser call goes through
+    call(), which runs it on a single executor thread, one at a time.
     """
     
     def __init__(self):
-        self.driver = None
+        self.browser = None
+        self.browser_backend = 'selenium'
+        self.cdp_port = DEFAULT_CDP_PORT
+        self.cdp_attach = False
+        self.profile_dir = DEFAULT_PROFILE_DIR  # None for a throwaway profile per start
+        self.disk_cache_mb = DEFAULT_DISK_CACHE_MB
         self.urls = []
+        self.tab_handles = []  # backend tab id for each entry in self.urls (None if not loaded)
+        self.max_live_tabs = 0  # 0 keeps one live tab per URL
+        self.display_mode = 'tabs'
+        self.shell_url = DEFAULT_SHELL_URL
+        self.load_times = {}  # measured load time in seconds per URL
+        self.load_timeouts = {}  # startup readiness timeout per URL
+        self.memory_budget_mb = 0  # restart the browser above this total RSS (0 = off)
+        self.tab_memory_mb = 0  # reload hidden tabs whose JS heap exceeds this (0 = off)
+        self.governor_interval = 30
+        self.tab_memory = {}  # tab -> JS heap bytes, sampled as each tab is left
         self.current_tab = 0
         self.cycle_delay = 10  # default delay in seconds
-        self.stop_event = threading.Event()
+        self.prewarm_seconds = 5  # reload the next tab this long before showing it
+        self.freeze_background = True  # freeze hidden tabs (cdp backend only)
+        self.frozen_tabs = set()
+        # Hidden tabs to reload when next shown, on backends that cannot reload them in the background
+        self.deferred_reloads = set()
+        self.loop = None  # asyncio event loop, set by main()
+        self.executor = None  # single thread for blocking browser calls
+        self.stop_event = threading.Event()  # also checked by long browser calls in the executor
+        self.stopped = None  # asyncio.Event: ends main()
+        self.wake_event = None  # asyncio.Event: interrupts waits for config changes and restarts
+        self.limits_changed = None  # asyncio.Event: wakes an idle governor after a config reload
+        self.config_changed = False
+        self.restart_requested = False
+        self.rotation_changed = False  # pause, resume or show from the control socket
+        self.paused = False
+        self.requested_tab = None  # tab to show next, ahead of the schedule
+        self.switch_deadline = None  # time.monotonic() of the next scheduled switch
+        self.control_socket = DEFAULT_CONTROL_SOCKET  # None disables the control socket
+        self.control_server = None
+        self.running_display_mode = None
+        self.config_watcher = None
         self.config_last_modified = None
+        self.refresh_tracker = RefreshTracker()
+        self.schedule = PlaylistSchedule()
+        self.breaker = CircuitBreaker()
         
         # Load initial configuration
         self.load_config()
         
-        # Handle termination signals for clean shutdown
-        signal.signal(signal.SIGTERM, self._handle_signal)
-        signal.signal(signal.SIGINT, self._handle_signal)
-        
     def log(self, message):
         """Log message with timestamp"""
         timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
         print(f"[{timestamp}] {message}", flush=True)
         
-    def _handle_signal(self, signum, frame):
+    def _handle_signal(self, signum):
         """Handle termination signals for clean shutdown"""
         self.log(f"[INFO] Received signal {signum}, shutting down gracefully...")
+        self.stop()
+        
+    def _handle_restart_signal(self, signum):
+        """Handle SIGHUP by restarting the browser"""
+        self.log(f"[INFO] Received signal {signum}, restarting browser...")
+        self.request_restart()
+        
+    def stop(self):
+        """Stop the controller (safe to call from any thread)"""
         self.stop_event.set()
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.stopped.set)
+        
+    def request_restart(self):
+        """Ask the cycling duty to restart the browser (call on the event loop)"""
+        self.restart_requested = True
+        self.wake_event.set()
+        
+    def _on_config_file_changed(self):
+        """Called on the event loop by the config watcher after config.json changes"""
+        self.config_changed = True
+        self.wake_event.set()
+        
+    async def call(self, func, *args):
+        """Run a blocking browser call on the executor thread and wait for its result"""
+        return await self.loop.run_in_executor(self.executor, func, *args)
+        
+    async def wait(self, seconds):
+        """
+        Sleep for up to `seconds` (None: until interrupted), applying config
+        changes and restarts as soon as they arrive.
+        
+        Returns:
+            bool: True if the wait was cut short (stopping, or the tabs may have
+            changed), False if the full time elapsed
+        """
+        deadline = None if seconds is None else time.monotonic() + seconds
+        
+        while not self.stop_event.is_set():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self.wake_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+            
+            self.wake_event.clear()
+            interrupted = self.rotation_changed
+            self.rotation_changed = False
+            if self.config_changed:
+                self.config_changed = False
+                interrupted = True
+                restart = await self.call(self.check_config_reload)
+                self.limits_changed.set()
+                if restart:
+                    if self.display_mode != self.running_display_mode:
+                        # The cycling duty itself changes, so restart the whole service
+                        self.log("[INFO] Restarting kiosk due to display_mode change...")
+                        self.stop()
+                        return True
+                    self.log("[INFO] Restarting browser due to config change...")
+                    self.restart_requested = True
+            if self.restart_requested:
+                self.restart_requested = False
+                await self.call(self.restart_browser)
+                interrupted = True
+            if interrupted:
+                return True
+        
+        return True
+        
+    async def wait_until(self, deadline):
+        """Like wait(), but until an absolute time.monotonic() deadline"""
+        return await self.wait(deadline - time.monotonic())
         
     def load_config(self):
         """Load configuration from JSON file"""
@@ -69,7 +218,8 @@ class KioskController:
             with open(CONFIG_FILE, 'r') as f:
                 config = json.load(f)
             
-            # Validate URLs
+            # Parse and validate everything before changing any state, so a
+            # bad save leaves the running configuration untouched
             urls = config.get('urls', [])
             if not urls:
                 raise ValueError("No URLs configured in config.json")
@@ -77,14 +227,90 @@ class KioskController:
             if not all(isinstance(url, str) and url.strip() for url in urls):
                 raise ValueError("All URLs must be non-empty strings")
             
+            cycle_delay = int(config.get('cycle_delay', 10))
+            if cycle_delay <= 0:
+                raise ValueError("cycle_delay must be a positive integer")
+            
+            prewarm_seconds = float(config.get('prewarm_seconds', 5))
+            if prewarm_seconds < 0:
+                raise ValueError("prewarm_seconds must not be negative")
+            
+            # Dry runs: both raise ValueError for invalid policies or windows
+            RefreshTracker().configure(config)
+            schedule = PlaylistSchedule()
+            schedule.configure(config)
+            
+            failure_threshold = int(config.get('failure_threshold', 3))
+            if failure_threshold <= 0:
+                raise ValueError("failure_threshold must be a positive integer")
+            
+            browser_backend = config.get('browser_backend', 'selenium')
+            if browser_backend not in BACKENDS:
+                raise ValueError(f"browser_backend must be one of {', '.join(BACKENDS)}")
+            cdp_port = int(config.get('cdp_port', DEFAULT_CDP_PORT))
+            control_socket = config.get('control_socket', str(DEFAULT_CONTROL_SOCKET))
+            profile_dir = config.get('browser_profile_dir', str(DEFAULT_PROFILE_DIR))
+            disk_cache_mb = int(config.get('disk_cache_mb', DEFAULT_DISK_CACHE_MB))
+            if disk_cache_mb < 0:
+                raise ValueError("disk_cache_mb must not be negative")
+            
+            max_live_tabs = int(config.get('max_live_tabs', 0))
+            if max_live_tabs < 0 or max_live_tabs == 1:
+                raise ValueError("max_live_tabs must be 0 (unlimited) or at least 2")
+            
+            display_mode = config.get('display_mode', 'tabs')
+            if display_mode not in DISPLAY_MODES:
+                raise ValueError(f"display_mode must be one of {', '.join(DISPLAY_MODES)}")
+            
+            load_timeouts = {}
+            for url, settings in (config.get('url_settings') or {}).items():
+                if isinstance(settings, dict) and 'load_timeout' in settings:
+                    load_timeouts[url] = float(settings['load_timeout'])
+                    if load_timeouts[url] <= 0:
+                        raise ValueError(f"load_timeout must be positive (got {settings['load_timeout']!r} for {url})")
+            
+            memory_budget_mb = float(config.get('memory_budget_mb', 0))
+            tab_memory_mb = float(config.get('tab_memory_mb', 0))
+            governor_interval = float(config.get('governor_interval', 30))
+            if memory_budget_mb < 0 or tab_memory_mb < 0 or governor_interval <= 0:
+                raise ValueError("memory_budget_mb and tab_memory_mb must not be negative, governor_interval must be positive")
+            
+            # All valid: apply
             self.urls = urls
-            self.cycle_delay = int(config.get('cycle_delay', 10))
+            self.cycle_delay = cycle_delay
+            self.prewarm_seconds = prewarm_seconds
+            self.refresh_tracker.configure(config)
+            self.schedule = schedule
+            self.breaker.threshold = failure_threshold
+            self.breaker.forget(urls)
             
-            if self.cycle_delay <= 0:
-                raise ValueError("cycle_delay must be a positive integer")
+            if self.browser and browser_backend != self.browser_backend:
+                self.log("[WARN] browser_backend changed, takes effect after a restart")
+            else:
+                self.browser_backend = browser_backend
+            self.cdp_port = cdp_port
+            self.cdp_attach = bool(config.get('cdp_attach', False))
+            self.control_socket = Path(control_socket).expanduser() if control_socket else None
+            self.profile_dir = Path(profile_dir).expanduser() if profile_dir else None
+            self.disk_cache_mb = disk_cache_mb
+            self.freeze_background = bool(config.get('freeze_background_tabs', True))
+            self.max_live_tabs = max_live_tabs
+            self.display_mode = display_mode
+            self.shell_url = config.get('shell_url', DEFAULT_SHELL_URL)
+            self.load_timeouts = load_timeouts
+            self.memory_budget_mb = memory_budget_mb
+            self.tab_memory_mb = tab_memory_mb
+            self.governor_interval = governor_interval
             
             self.config_last_modified = current_mtime
             self.log(f"[INFO] Loaded {len(self.urls)} URLs with cycle delay of {self.cycle_delay}s")
+            for url, policy in self.refresh_tracker.policies.items():
+                if url in self.urls:
+                    self.log(f"[INFO] Refresh policy {policy} for {url[:80]}")
+            for url in self.urls:
+                if url in self.schedule.dwell or url in self.schedule.windows:
+                    windows = self.schedule.windows.get(url) or 'always'
+                    self.log(f"[INFO] Dwell {self.schedule.dwell_for(url):g}s, active {windows} for {url[:80]}")
             
         except FileNotFoundError as e:
             self.log(f"[ERROR] Config file not found: {e}")
@@ -97,175 +323,1015 @@ class KioskController:
             raise
             
     def check_config_reload(self):
-        """Check if config has changed and reload if needed"""
+        """
+        Check if config has changed and reload if needed.
+        
+        URL changes are applied to the open browser in place. Returns True
+        only if that fails and a full browser restart is required.
+        """
         try:
             if CONFIG_FILE.exists():
                 current_mtime = CONFIG_FILE.stat().st_mtime
                 if current_mtime != self.config_last_modified:
                     self.log("[INFO] Config file changed, reloading...")
                     old_urls = self.urls[:]
+                    old_display_mode = self.display_mode
                     self.load_config()
                     
-                    # If URLs changed significantly, restart browser
-                    if old_urls != self.urls:
-                        self.log("[INFO] URLs changed, browser restart required")
+                    if self.display_mode != old_display_mode:
+                        self.log(f"[INFO] display_mode changed to {self.display_mode}, browser restart required")
                         return True
+                    if self.display_mode == 'shell':
+                        return False  # the shell page picks up playlist changes itself
+                    
+                    if old_urls != self.urls:
+                        self.log("[INFO] URLs changed, updating tabs...")
+                        try:
+                            self.reconcile_tabs(old_urls)
+                        except Exception as e:
+                            self.log(f"[ERROR] Failed to update tabs in place: {e}")
+                            self.log("[INFO] URLs changed, browser restart required")
+                            return True
+                    
+                    self.trim_tab_pool()
+                    self.update_frozen_tabs()
         except Exception as e:
             self.log(f"[WARN] Error checking config reload: {e}")
         
         return False
         
+    def reconcile_tabs(self, old_urls):
+        """
+        Bring the open tabs in line with self.urls without restarting the browser.
+        
+        Tabs whose URL is still configured are kept (and keep their loaded
+        page), new URLs get new tabs and tabs for removed URLs are closed.
+        With a bounded tab pool, removed tabs are reused for new URLs and
+        URLs beyond the pool size are left to load on demand.
+        The handle list is then rebuilt in the new order.
+        """
+        old_handles = self.tab_handles
+        current_handle = old_handles[self.current_tab] if self.current_tab < len(old_handles) else None
+        
+        # Reusable tabs per URL, in their old order (URLs may appear more than once)
+        available = {}
+        for url, handle in zip(old_urls, old_handles):
+            if handle:
+                available.setdefault(url, []).append(handle)
+        
+        new_handles = [available[url].pop(0) if available.get(url) else None for url in self.urls]
+        removed = [handle for handles in available.values() for handle in handles]
+        # Reuse the visible tab last so the screen does not change under the viewer
+        removed.sort(key=lambda handle: handle == current_handle)
+        
+        # Open added tabs before closing removed ones so the browser never runs out of tabs
+        added = 0
+        kept = sum(1 for handle in new_handles if handle)
+        for i, url in enumerate(self.urls):
+            if new_handles[i] is not None:
+                continue
+            if self.max_live_tabs and kept + added >= self.max_live_tabs:
+                continue  # loaded on demand
+            if not self.schedule.is_active(url) and (kept or added):
+                continue  # loaded when its schedule window opens
+            if self.max_live_tabs and removed:
+                new_handles[i] = removed.pop(0)
+                self.set_tab_frozen(new_handles[i], False)
+                self.browser.navigate(new_handles[i], url)
+                self.refresh_tracker.mark_loaded(url)
+            else:
+                new_handles[i] = self.open_tab(url)
+            added += 1
+            self.log(f"[INFO] Opened tab {i + 1}: {url[:80]}")
+        
+        for handle in removed:
+            self.close_tab(handle)
+        
+        self.tab_handles = new_handles
+        
+        # Keep showing the same page if it survived, otherwise start from the first loaded tab
+        if current_handle in new_handles:
+            self.current_tab = new_handles.index(current_handle)
+        else:
+            self.current_tab = next(i for i, handle in enumerate(new_handles) if handle)
+        self.set_tab_frozen(self.tab_handles[self.current_tab], False)
+        self.browser.activate(self.tab_handles[self.current_tab])
+        
+        self.log(f"[INFO] Tabs updated: {kept} kept, {added} opened, {len(removed)} closed")
+        
+    def open_tab(self, url):
+        """Open a URL in a new tab and return its tab id"""
+        tab = self.browser.open_tab(url)
+        self.refresh_tracker.mark_loaded(url)
+        return tab
+        
+    def close_tab(self, handle):
+        """Close a tab by tab id"""
+        self.frozen_tabs.discard(handle)
+        self.tab_memory.pop(handle, None)
+        try:
+            self.browser.close_tab(handle)
+        except Exception as e:
+            self.log(f"[WARN] Failed to close tab: {e}")
+            
+    def prewarm_lead(self):
+        """
+        Seconds ahead of its turn to reload the next page, or 0 to refresh
+        it after switching instead. The Selenium backend cannot reach a tab
+        without bringing it to the front, so it never pre-warms.
+        """
+        return self.prewarm_seconds if self.browser.can_prewarm else 0
+        
+    def set_tab_frozen(self, tab, frozen):
+        """
+        Freeze a hidden tab so its timers and animations stop using CPU, or
+        resume it ahead of being shown. Does nothing if freezing is disabled
+        or the browser backend cannot freeze tabs.
+        """
+        if frozen and not (self.freeze_background and self.browser.can_freeze):
+            return
+        if (tab in self.frozen_tabs) == frozen:
+            return
+        try:
+            self.browser.set_frozen(tab, frozen)
+            if frozen:
+                self.frozen_tabs.add(tab)
+            else:
+                self.frozen_tabs.discard(tab)
+        except Exception as e:
+            self.log(f"[WARN] Failed to {'freeze' if frozen else 'resume'} tab: {e}")
+            
+    def update_frozen_tabs(self):
+        """Freeze every tab except the visible one, or resume them all if freezing is off"""
+        current_handle = self.tab_handles[self.current_tab] if self.tab_handles else None
+        for handle in self.tab_handles:
+            if handle:
+                self.set_tab_frozen(handle, self.freeze_background and handle != current_handle)
+                
+    def live_tab_count(self):
+        """Return the number of tabs currently loaded in the browser"""
+        return sum(1 for handle in self.tab_handles if handle)
+        
+    def _pool_victim(self, index):
+        """
+        Pick the loaded tab to give up so tab `index` can be loaded.
+        
+        The rotation order is fixed, so the tab whose next turn is furthest
+        away is evicted (plain LRU would pick the tab needed soonest). Pages
+        that are slow to load are only evicted if nothing cheaper is left.
+        The visible tab is never evicted.
+        
+        Returns:
+            int or None: Index of the tab to evict, or None if there is none
+        """
+        candidates = [i for i, handle in enumerate(self.tab_handles)
+                      if handle and i not in (self.current_tab, index)]
+        if not candidates:
+            return None
+        
+        cheap = [i for i in candidates
+                 if self.load_times.get(self.urls[i], 0) < EXPENSIVE_LOAD_SECONDS]
+        return max(cheap or candidates, key=lambda i: (i - self.current_tab) % len(self.urls))
+        
+    def ensure_tab(self, index):
+        """
+        Make sure the URL at `index` is loaded in a tab.
+        
+        When the pool is full the tab chosen by _pool_victim() is navigated
+        to the URL instead of opening a new one.
+        
+        Returns:
+            bool: True if the page was loaded now, False if it was already live
+        """
+        if self.tab_handles[index]:
+            return False
+        
+        url = self.urls[index]
+        victim = None
+        if self.max_live_tabs and self.live_tab_count() >= self.max_live_tabs:
+            victim = self._pool_victim(index)
+        
+        if victim is None:
+            handle = self.open_tab(url)
+            self.log(f"[INFO] Loading tab {index + 1}: {url[:80]}")
+        else:
+            handle = self.tab_handles[victim]
+            self.tab_handles[victim] = None
+            self.set_tab_frozen(handle, False)
+            self.browser.navigate(handle, url)
+            self.refresh_tracker.mark_loaded(url)
+            self.log(f"[INFO] Loading tab {index + 1} in place of tab {victim + 1}: {url[:80]}")
+        
+        self.tab_handles[index] = handle
+        return True
+        
+    def trim_tab_pool(self):
+        """Close loaded tabs beyond max_live_tabs (after the pool size was lowered)"""
+        while self.max_live_tabs and self.live_tab_count() > self.max_live_tabs:
+            victim = self._pool_victim(self.current_tab)
+            if victim is None:
+                break
+            self.close_tab(self.tab_handles[victim])
+            self.tab_handles[victim] = None
+            
+    def record_load_time(self, tab, url):
+        """Remember how long a page took to load, for pool eviction"""
+        try:
+            self.load_times[url] = float(self.browser.evaluate(tab, LOAD_TIME_EXPRESSION))
+        except Exception:
+            pass
+        
     def create_driver(self):
-        """Create and configure the Chrome WebDriver"""
-        self.log("[INFO] Creating Chrome driver...")
-        
-        chrome_options = Options()
-        
-        # Set Chromium binary location
-        chrome_options.binary_location = CHROMIUM_BINARY
-        
-        # Kiosk mode settings
-        chrome_options.add_argument("--kiosk")
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--noerrdialogs")
-        chrome_options.add_argument("--disable-infobars")
-        chrome_options.add_argument("--disable-session-crashed-bubble")
-        chrome_options.add_argument("--disable-restore-session-state")
-        
-        # Allow loading local file:// URLs
-        chrome_options.add_argument("--allow-file-access-from-files")
-        chrome_options.add_argument("--allow-file-access")
-        
-        # Disable distracting features
-        chrome_options.add_argument("--disable-features=TranslateUI")
-        chrome_options.add_argument("--disable-pinch")
-        chrome_options.add_argument("--overscroll-history-navigation=0")
-        chrome_options.add_argument("--disable-gesture-typing")
-        
-        # Performance optimizations for Raspberry Pi
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--disable-software-rasterizer")
-        
-        # Logging (helpful for debugging)
-        chrome_options.add_argument("--enable-logging=stderr")
-        chrome_options.add_argument("--v=1")
-        
-        # Disable automation flags
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
-        
-        # Create driver
-        service = Service(CHROMEDRIVER_PATH)
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        self.driver.set_page_load_timeout(30)
-        
-        self.log("[INFO] Chrome driver created successfully")
-        
-    def open_tabs(self):
-        """Open all configured URLs in separate tabs"""
+        """Start Chromium through the configured browser backend"""
+        self.log(f"[INFO] Starting browser ({self.browser_backend} backend)...")
+        
+        options = {"profile_dir": self.profile_dir, "disk_cache_mb": self.disk_cache_mb}
+        if self.browser_backend == 'cdp':
+            options.update(port=self.cdp_port, attach=self.cdp_attach)
+        
+        self.browser = create_backend(self.browser_backend, log=self.log, **options)
+        self.browser.start()
+        
+        self.log("[INFO] Browser started successfully")
+        
+    def restart_browser(self):
+        """
+        Replace the browser with a fresh one, in place.
+        
+        Kiosk mode can only be chosen when Chromium starts, and a second
+        browser started in kiosk mode would cover the screen while it loads,
+        so the old browser is closed first and the screen is blank until the
+        new one shows the page that was on screen (loaded from the disk
+        cache). Falls back to a full service restart if the browser cannot
+        be started again.
+        """
+        current_url = self.urls[self.current_tab] if self.current_tab < len(self.urls) else None
+        self.log("[INFO] Restarting browser...")
+        start = time.monotonic()
+        self.cleanup_browser()
+        self.frozen_tabs = set()
+        self.deferred_reloads = set()
+        self.tab_memory = {}
+        
+        if not self.start_browser(first=self.urls.index(current_url) if current_url in self.urls else None):
+            self.log("[INFO] Restarting kiosk service...")
+            self.stop()
+            return
+        self.log(f"[INFO] Browser restarted in {time.monotonic() - start:.1f}s")
+        
+    def open_tabs(self, first=None):
+        """
+        Open all configured URLs in separate tabs.
+        
+        Args:
+            first (int): Index of the URL to show first (default: the first
+                one in its schedule window)
+        """
         if not self.urls:
             self.log("[ERROR] No URLs to open")
             return
             
         self.log(f"[INFO] Opening {len(self.urls)} tabs...")
         
-        # Open first URL in current tab
-        self.driver.get(self.urls[0])
-        self.log(f"[INFO] Tab 1: {self.urls[0]}")
+        # Start with the first URL in its active window
+        if first is None:
+            first = self.schedule.next_index(self.urls, len(self.urls) - 1)
+        first_tab = self.browser.first_tab()
+        self.tab_handles = [None] * len(self.urls)
+        self.tab_handles[first] = first_tab
         
-        # Open remaining URLs in new tabs
-        for i, url in enumerate(self.urls[1:], start=2):
-            self.driver.execute_script(f"window.open('{url}', '_blank');")
-            self.log(f"[INFO] Tab {i}: {url}")
+        # Open the other active URLs in new tabs, up to the pool size; the rest
+        # are loaded when their turn comes. Opening a tab does not wait for it
+        # to load, so all pages load at the same time.
+        live_limit = self.max_live_tabs or len(self.urls)
+        for i, url in enumerate(self.urls):
+            if self.tab_handles[i] or self.live_tab_count() >= live_limit:
+                continue
+            if not self.schedule.is_active(url):
+                continue
+            self.tab_handles[i] = self.open_tab(url)
+            self.log(f"[INFO] Tab {i + 1}: {url}")
         
-        # Give tabs time to load
-        time.sleep(5)
+        # Load the first URL in the current tab last (Selenium blocks on it)
+        self.browser.navigate(first_tab, self.urls[first])
+        self.refresh_tracker.mark_loaded(self.urls[first])
+        self.log(f"[INFO] Tab {first + 1}: {self.urls[first]}")
         
-        # Verify all tabs opened
-        handles = self.driver.window_handles
-        self.log(f"[INFO] Successfully opened {len(handles)} browser tabs")
+        self.wait_for_tabs([i for i, handle in enumerate(self.tab_handles) if handle])
+        
+        self.log(f"[INFO] Successfully opened {self.live_tab_count()} browser tabs")
+        if self.live_tab_count() < len(self.urls):
+            self.log(f"[INFO] {len(self.urls) - self.live_tab_count()} more pages load on demand (max_live_tabs={self.max_live_tabs})")
         
         # Switch back to first tab
-        self.driver.switch_to.window(handles[0])
+        self.browser.activate(first_tab)
+        self.current_tab = first
+        
+        # Only the visible tab needs to keep running
+        self.update_frozen_tabs()
+        if self.frozen_tabs:
+            self.log(f"[INFO] Froze {len(self.frozen_tabs)} background tabs")
+        
+    def open_shell(self):
+        """Open the kiosk shell page in the browser's only tab"""
+        self.log(f"[INFO] Opening kiosk shell: {self.shell_url}")
+        first_tab = self.browser.first_tab()
+        self.browser.navigate(first_tab, self.shell_url)
+        self.browser.activate(first_tab)
+        self.tab_handles = [first_tab]
         self.current_tab = 0
         
-    def cycle_tabs(self):
-        """Continuously cycle through tabs, switching at configured intervals"""
+    async def watch_shell(self):
+        """Check that the shell page is alive, reloading it if it stops responding"""
+        self.log("[INFO] Watching kiosk shell...")
+        missed = 0
+        last_heartbeat = None
+        last_url = None
+        
+        while not self.stop_event.is_set():
+            if await self.wait(SHELL_CHECK_INTERVAL):
+                continue
+            
+            try:
+                state = await self.call(self.browser.evaluate, self.tab_handles[0], SHELL_STATE_EXPRESSION)
+            except Exception:
+                state = None
+            
+            heartbeat, url = state if state else (None, None)
+            if heartbeat is None or heartbeat == last_heartbeat:
+                missed += 1
+            else:
+                missed = 0
+            last_heartbeat = heartbeat
+            
+            if url and url != last_url:
+                self.log(f"[INFO] Shell showing: {url[:80]}")
+                last_url = url
+            
+            if missed >= SHELL_MAX_MISSED_CHECKS:
+                self.log("[WARN] Kiosk shell not responding, reloading it")
+                try:
+                    await self.call(self.browser.navigate, self.tab_handles[0], self.shell_url)
+                except Exception as e:
+                    self.log(f"[ERROR] Failed to reload kiosk shell: {e}")
+                missed = 0
+                
+    async def cycle_tabs(self):
+        """
+        Continuously cycle through tabs on a deadline schedule.
+        
+        Each switch is due at an absolute time on the monotonic clock: the
+        previous deadline plus the dwell time of the page shown. Time spent
+        switching, reloading or waiting on the browser therefore does not
+        push later switches back, and a config change keeps the deadline
+        of the page on screen.
+        """
         self.log("[INFO] Starting tab cycling...")
+        shown_at = time.monotonic()
+        deadline = None
+        prewarmed_tab = None  # tab pre-warmed for the current deadline
         
         while not self.stop_event.is_set():
             try:
-                handles = self.driver.window_handles
+                handles = self.tab_handles
                 
                 if not handles:
                     self.log("[ERROR] No browser tabs available")
                     break
                 
-                # Move to next tab
-                self.current_tab = (self.current_tab + 1) % len(handles)
-                self.driver.switch_to.window(handles[self.current_tab])
+                if deadline is None:
+                    deadline = shown_at + self.schedule.dwell_for(self.urls[self.current_tab])
                 
-                # Log current tab (useful for monitoring)
-                try:
-                    current_url = self.driver.current_url
-                    self.log(f"[INFO] Tab {self.current_tab + 1}/{len(handles)}: {current_url[:80]}")
-                except:
-                    self.log(f"[INFO] Switched to tab {self.current_tab + 1}/{len(handles)}")
+                jump, self.requested_tab = self.requested_tab, None
+                if jump is None and self.paused:
+                    # Hold the page on screen until resumed; it then gets a full dwell
+                    self.switch_deadline = None
+                    await self.wait(None)
+                    shown_at, deadline = time.monotonic(), None
+                    continue
                 
-                # Refresh current tab to get latest data
-                try:
-                    self.driver.refresh()
-                except Exception as e:
-                    self.log(f"[WARN] Failed to refresh tab: {e}")
+                if jump is not None and jump < len(self.urls):
+                    # Shown on request from the control socket, straight away
+                    next_tab = jump
+                    deadline = time.monotonic()
+                    prewarmed_tab = None
+                else:
+                    next_tab = self.schedule.next_index(self.urls, self.current_tab,
+                                                        available=self.breaker.is_available)
+                    self.switch_deadline = deadline
+                    
+                    # Dwell on the current tab, pre-warming the next one shortly before its turn
+                    # A config change interrupts the dwell so the loop restarts with the new tabs
+                    lead = min(self.prewarm_lead(), (deadline - shown_at) / 2)
+                    if lead > 0 and next_tab != self.current_tab:
+                        if await self.wait_until(deadline - lead):
+                            continue
+                        if prewarmed_tab is None:
+                            prewarmed_tab = await self.call(self.prewarm_next, next_tab)
+                    if await self.wait_until(deadline):
+                        continue
                 
-                # Check for config changes every cycle
-                if self.check_config_reload():
-                    self.log("[INFO] Restarting browser due to config change...")
-                    self.stop_event.set()
-                    break
+                if next_tab == self.current_tab:
+                    # Nothing else is in its window; keep this page up for another dwell
+                    shown_at, deadline = deadline, deadline + self.schedule.dwell_for(self.urls[self.current_tab])
+                    await self.call(self.keep_current_tab)
+                    continue
                 
-                # Wait for configured delay
-                self.stop_event.wait(self.cycle_delay)
+                loaded = await self.call(self.switch_to, next_tab)
+                prewarmed = bool(prewarmed_tab) and prewarmed_tab == handles[next_tab]
+                
+                # Next deadline counts from this one, not from now, so switching time never accumulates
+                shown_at, deadline = deadline, deadline + self.schedule.dwell_for(self.urls[self.current_tab])
+                prewarmed_tab = None
+                if deadline <= time.monotonic():
+                    # Fell a whole dwell behind (e.g. the system was suspended); start afresh
+                    shown_at = time.monotonic()
+                    deadline = shown_at + self.schedule.dwell_for(self.urls[self.current_tab])
+                
+                ready = not loaded
+                if prewarmed:
+                    # Normally already complete; only waits if the page loads slower than the pre-warm lead
+                    ready = await self.wait_until_ready(handles[self.current_tab], self.prewarm_seconds)
+                    if not ready:
+                        self.log(f"[WARN] Tab {self.current_tab + 1} not ready after pre-warm")
+                    elif self.max_live_tabs:
+                        await self.call(self.record_load_time, handles[self.current_tab], self.urls[self.current_tab])
+                elif not self.prewarm_lead() and not loaded and self.current_tab < len(self.urls):
+                    # Pre-warming disabled: refresh after switching if the policy calls for it
+                    await self.call(self.refresh_tab, handles[self.current_tab], self.urls[self.current_tab])
+                
+                if not ready:
+                    # A page that is still loading could be mistaken for a hung one
+                    url = self.urls[self.current_tab]
+                    await self.wait_until_ready(handles[self.current_tab],
+                                                self.load_timeouts.get(url, DEFAULT_LOAD_TIMEOUT))
+                
+                if not await self.call(self.check_tab_health, self.current_tab):
+                    # Move on straight away rather than showing a broken page for a whole dwell
+                    shown_at = deadline = time.monotonic()
+                    continue
+                
+                await self.call(self.unload_inactive_tabs)
                 
             except Exception as e:
                 self.log(f"[ERROR] Error during tab cycling: {e}")
-                time.sleep(5)  # Brief pause before retrying
+                deadline = None
+                shown_at = time.monotonic()
+                await asyncio.sleep(5)  # Brief pause before retrying
                 
-    def start_browser(self):
-        """Start the browser with retry logic"""
+    def prewarm_next(self, index):
+        """
+        Get the tab at `index` ready ahead of its turn: load it if it is not
+        live, otherwise resume it and reload it if its refresh policy says so.
+        
+        Returns:
+            The pre-warmed tab id, or False if the tab was left as it was
+        """
+        if self.ensure_tab(index):
+            return self.tab_handles[index]
+        self.set_tab_frozen(self.tab_handles[index], False)
+        if self.prewarm_tab(self.tab_handles, index):
+            return self.tab_handles[index]
+        return False
+        
+    def keep_current_tab(self):
+        """Keep the current page up for another dwell, reopening it if it had been closed after failing"""
+        if self.ensure_tab(self.current_tab):
+            self.browser.activate(self.tab_handles[self.current_tab])
+        self.unload_inactive_tabs()
+        
+    def switch_to(self, index):
+        """
+        Bring the tab at `index` to the front, then freeze the one that was just hidden.
+        
+        Returns:
+            bool: True if the page had to be loaded first
+        """
+        handles = self.tab_handles
+        loaded = self.ensure_tab(index)
+        previous_handle = handles[self.current_tab] if self.current_tab < len(handles) else None
+        if previous_handle and (self.memory_budget_mb or self.tab_memory_mb):
+            self.sample_tab_memory(previous_handle)
+        self.set_tab_frozen(handles[index], False)
+        self.current_tab = index
+        self.browser.activate(handles[index])
+        if handles[index] in self.deferred_reloads:
+            # Reload requested while hidden; now it can be done without showing another tab
+            self.deferred_reloads.discard(handles[index])
+            self.browser.reload(handles[index])
+            self.refresh_tracker.mark_loaded(self.urls[index])
+            loaded = True
+        if previous_handle and previous_handle != handles[index]:
+            self.set_tab_frozen(previous_handle, True)
+        
+        # Log current tab (useful for monitoring)
+        try:
+            current_url = self.browser.get_url(handles[index])
+            self.log(f"[INFO] Tab {index + 1}/{len(handles)}: {current_url[:80]}")
+        except:
+            self.log(f"[INFO] Switched to tab {index + 1}/{len(handles)}")
+        return loaded
+                
+    def check_tab_health(self, index):
+        """
+        Probe the tab at `index` (the one just brought on screen) and
+        recover it if it is broken.
+        
+        Failures are counted per URL; a URL that keeps failing is taken out
+        of the rotation for a growing backoff period by the circuit breaker.
+        
+        Returns:
+            bool: True if the tab is healthy
+        """
+        handle = self.tab_handles[index]
+        url = self.urls[index]
+        if not handle:
+            return True
+        
+        status = probe_tab(self.browser, handle)
+        if status == HEALTHY:
+            self.breaker.record_success(url)
+            return True
+        
+        self.log(f"[WARN] Tab {index + 1} {status.replace('_', ' ')}: {url[:80]}")
+        delay = self.breaker.record_failure(url)
+        if delay:
+            self.log(f"[WARN] Skipping tab {index + 1} for {delay:.0f}s after repeated failures")
+        self.recover_tab(index, status)
+        return False
+        
+    def recover_tab(self, index, status):
+        """
+        Recover a single broken tab without touching the others.
+        
+        Error pages are reloaded in place. A crashed or hung renderer will
+        not respond to a reload, so the tab is navigated to its URL again,
+        which starts a new renderer. The tab is the one on screen, so it is
+        kept open rather than closed and reopened later.
+        """
+        handle = self.tab_handles[index]
+        url = self.urls[index]
+        try:
+            if status == NETWORK_ERROR:
+                self.browser.reload(handle, background=True)
+            else:
+                self.browser.navigate(handle, url)
+            self.refresh_tracker.mark_loaded(url)
+        except Exception as e:
+            self.log(f"[WARN] Failed to recover tab {index + 1}: {e}")
+            
+    def sample_tab_memory(self, tab):
+        """Record a tab's JS heap size for the resource governor (call while it is active)"""
+        try:
+            heap = self.browser.evaluate(tab, TAB_MEMORY_EXPRESSION)
+        except Exception:
+            return
+        if heap is not None:
+            self.tab_memory[tab] = heap
+            
+    async def govern_resources(self):
+        """
+        Watch Chromium's memory use and reclaim it before the Pi runs out.
+        
+        Samples RSS and CPU of the browser's process tree from /proc every
+        governor_interval seconds. Hidden tabs whose JS heap is over
+        tab_memory_mb are reloaded; while the total is over memory_budget_mb
+        the largest hidden tab is reloaded, and if that does not bring it
+        down the browser is restarted. With neither limit set the governor
+        sleeps until a config reload, without waking up.
+        
+        Neither WebDriver nor CDP says which renderer process belongs to
+        which tab, so tabs are compared by the heap each page reports.
+        """
+        sampler = ProcessSampler()
+        over_budget = 0
+        
+        while not self.stop_event.is_set():
+            if not (self.memory_budget_mb or self.tab_memory_mb):
+                self.limits_changed.clear()
+                await self.limits_changed.wait()
+                continue
+            
+            await asyncio.sleep(self.governor_interval)
+            if not (self.memory_budget_mb or self.tab_memory_mb) or not self.browser:
+                continue
+            
+            try:
+                sample = await self.call(self.sample_resources, sampler)
+            except Exception as e:
+                self.log(f"[WARN] Resource governor could not sample the browser: {e}")
+                continue
+            if sample is None:
+                continue
+            usage, hidden = sample
+            
+            if self.tab_memory_mb:
+                for heap, tab in hidden:
+                    if heap > self.tab_memory_mb * 1024 * 1024:
+                        await self.reload_hidden(tab, f"JS heap {heap / 2**20:.0f} MB")
+            
+            total_mb = usage['rss'] / 2**20
+            if not self.memory_budget_mb or total_mb <= self.memory_budget_mb:
+                over_budget = 0
+                continue
+            
+            over_budget += 1
+            top = max(usage['processes'], key=lambda process: process['rss'])
+            self.log(f"[WARN] Browser using {total_mb:.0f} MB (budget {self.memory_budget_mb:.0f} MB, "
+                     f"{usage['cpu']:.0f}% CPU); largest: {top['type']} pid {top['pid']} "
+                     f"{top['rss'] / 2**20:.0f} MB")
+            
+            if over_budget > GOVERNOR_RELOAD_ATTEMPTS:
+                self.log("[WARN] Reloading tabs did not bring memory under budget, restarting browser...")
+                over_budget = 0
+                self.request_restart()
+            elif hidden:
+                await self.reload_hidden(hidden[0][1], "browser over memory budget")
+                
+    def sample_resources(self, sampler):
+        """
+        Sample the browser's process tree.
+        
+        Returns:
+            tuple: (usage from ProcessSampler.sample, [(heap, tab), ...] for
+            hidden tabs, largest first), or None if there is no browser pid
+        """
+        pid = self.browser.browser_pid() if self.browser else None
+        if not pid:
+            return None
+        usage = sampler.sample(pid)
+        
+        current_handle = self.tab_handles[self.current_tab] if self.current_tab < len(self.tab_handles) else None
+        hidden = sorted(((heap, tab) for tab, heap in self.tab_memory.items()
+                         if tab != current_handle and tab in self.tab_handles), reverse=True)
+        return usage, hidden
+        
+    async def reload_hidden(self, tab, reason):
+        """Reload a hidden tab for the resource governor, freezing it again once it has loaded"""
+        url = await self.call(self.reload_hidden_tab, tab, reason)
+        if url and self.freeze_background and self.browser.can_freeze:
+            await self.wait_until_ready(tab, self.load_timeouts.get(url, DEFAULT_LOAD_TIMEOUT))
+            await self.call(self.freeze_if_hidden, tab)
+            
+    def reload_hidden_tab(self, tab, reason):
+        """
+        Reload a hidden tab (resumed first if it was frozen).
+        
+        Backends that would have to bring the tab to the front to reload it
+        (can_prewarm is False) reload it when it is next shown instead.
+        
+        Returns:
+            str: The tab's URL if a reload was started, else None
+        """
+        current_handle = self.tab_handles[self.current_tab] if self.current_tab < len(self.tab_handles) else None
+        if tab not in self.tab_handles or tab == current_handle:
+            return None  # closed, or on screen (it is checked again once hidden)
+        
+        index = self.tab_handles.index(tab)
+        url = self.urls[index]
+        if not self.browser.can_prewarm:
+            if tab not in self.deferred_reloads:
+                self.log(f"[WARN] Reloading tab {index + 1} on its next turn ({reason}): {url[:80]}")
+                self.deferred_reloads.add(tab)
+            self.tab_memory.pop(tab, None)
+            return None
+        self.log(f"[WARN] Reloading tab {index + 1} ({reason}): {url[:80]}")
+        try:
+            self.set_tab_frozen(tab, False)
+            self.browser.reload(tab, background=True)
+            self.refresh_tracker.mark_loaded(url)
+            self.tab_memory.pop(tab, None)
+            return url
+        except Exception as e:
+            self.log(f"[WARN] Failed to reload tab {index + 1}: {e}")
+            return None
+            
+    def freeze_if_hidden(self, tab):
+        """Freeze a tab unless it was closed or brought on screen in the meantime"""
+        current_handle = self.tab_handles[self.current_tab] if self.current_tab < len(self.tab_handles) else None
+        if tab in self.tab_handles and tab != current_handle:
+            self.set_tab_frozen(tab, True)
+                
+    def unload_inactive_tabs(self):
+        """Close tabs for pages outside their schedule window; they reload when it opens"""
+        for i, handle in enumerate(self.tab_handles):
+            if handle and i != self.current_tab and not self.schedule.is_active(self.urls[i]):
+                self.close_tab(handle)
+                self.tab_handles[i] = None
+                self.log(f"[INFO] Unloaded tab {i + 1} until its schedule window: {self.urls[i][:80]}")
+                
+    def prewarm_tab(self, handles, index):
+        """
+        Reload a tab in the background ahead of its turn (only used where
+        the backend can_prewarm, so the page on screen stays put).
+        
+        Returns:
+            bool: True if a reload was started
+        """
+        if index >= len(self.urls) or index == self.current_tab:
+            return False
+        
+        url = self.urls[index]
+        if not self.refresh_tracker.should_refresh(url):
+            return False
+        
+        try:
+            self.browser.reload(handles[index], background=True)
+            self.refresh_tracker.mark_loaded(url)
+            return True
+        except Exception as e:
+            self.log(f"[WARN] Failed to pre-warm tab {index + 1}: {e}")
+            return False
+            
+    def _poll_ready(self, tab, last_count):
+        """
+        One readiness check: the load event has fired and no resource
+        requests started since the previous check (last_count).
+        
+        Returns:
+            tuple: (ready, resource count to pass to the next check)
+        """
+        try:
+            state, count = self.browser.evaluate(tab, READY_EXPRESSION)
+        except Exception:
+            return False, None  # page is mid-navigation
+        return state == 'complete' and count == last_count, count
+        
+    async def wait_until_ready(self, tab, timeout):
+        """
+        Wait until a tab has finished loading and gone network-idle.
+        
+        Returns:
+            bool: True if the tab became ready within the timeout
+        """
+        deadline = time.monotonic() + timeout
+        last_count = None
+        
+        while True:
+            ready, last_count = await self.call(self._poll_ready, tab, last_count)
+            if ready:
+                return True
+            
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(READY_POLL_INTERVAL)
+                
+    def wait_for_tabs(self, indices):
+        """
+        Wait for several loading tabs at once, logging each one's time to ready.
+        
+        All tabs are polled in turn, so the wait lasts as long as the slowest
+        page (or its load_timeout), not the sum of all of them.
+        """
+        start = time.monotonic()
+        pending = {index: None for index in indices}  # index -> last resource count
+        
+        while pending and not self.stop_event.is_set():
+            for index in list(pending):
+                url = self.urls[index]
+                ready, pending[index] = self._poll_ready(self.tab_handles[index], pending[index])
+                elapsed = time.monotonic() - start
+                
+                if ready:
+                    del pending[index]
+                    self.record_load_time(self.tab_handles[index], url)
+                    self.log(f"[INFO] Tab {index + 1} ready in {elapsed:.1f}s")
+                elif elapsed >= self.load_timeouts.get(url, DEFAULT_LOAD_TIMEOUT):
+                    del pending[index]
+                    self.log(f"[WARN] Tab {index + 1} not ready after {elapsed:.1f}s: {url[:80]}")
+            
+            if pending:
+                self.stop_event.wait(READY_POLL_INTERVAL)
+        
+        self.log(f"[INFO] Startup loading finished in {time.monotonic() - start:.1f}s")
+                
+    def refresh_tab(self, tab, url):
+        """Reload a tab if the refresh policy for its URL calls for it"""
+        try:
+            if not self.refresh_tracker.should_refresh(url):
+                return
+            self.browser.reload(tab)
+            self.refresh_tracker.mark_loaded(url)
+        except Exception as e:
+            self.log(f"[WARN] Failed to refresh tab: {e}")
+                
+    def start_browser(self, first=None):
+        """
+        Start the browser with retry logic.
+        
+        Args:
+            first (int): Index of the URL to show first (see open_tabs)
+        """
         retry_count = 0
         max_retries = 3
         
         while not self.stop_event.is_set() and retry_count < max_retries:
             try:
                 self.create_driver()
-                self.open_tabs()
+                if self.display_mode == 'shell':
+                    self.open_shell()
+                else:
+                    self.open_tabs(first=first)
                 return True
             except Exception as e:
                 retry_count += 1
                 self.log(f"[ERROR] Failed to start browser (attempt {retry_count}/{max_retries}): {e}")
+                self.cleanup_browser()
+                
+                if retry_count == max_retries - 1 and self.profile_dir:
+                    # Repeated failures may come from a damaged profile; the cache is expendable
+                    self.log(f"[WARN] Resetting browser profile {self.profile_dir}")
+                    reset_profile(self.profile_dir)
                 
                 if retry_count < max_retries:
                     self.log("[INFO] Retrying in 10 seconds...")
-                    time.sleep(10)
+                    self.stop_event.wait(10)
                 else:
                     self.log("[ERROR] Max retries reached, giving up")
                     return False
                     
         return False
         
+    async def handle_command(self, request):
+        """
+        Carry out a command from the control socket.
+        
+        Commands: state, reload_config, restart_browser, pause, resume,
+        show (index) and refresh (index, default: the page on screen).
+        Indices are 0-based positions in urls.
+        
+        Raises:
+            ValueError: For unknown commands or invalid arguments
+        """
+        command = request['command']
+        
+        if command == 'state':
+            return {"success": True, "message": "OK", "state": self.describe_state()}
+        if command == 'reload_config':
+            self.config_last_modified = None  # reload even if the file did not change
+            self._on_config_file_changed()
+            return {"success": True, "message": "Config reload requested"}
+        if command == 'restart_browser':
+            self.request_restart()
+            return {"success": True, "message": "Browser restart requested"}
+        
+        if command not in ('pause', 'resume', 'show', 'refresh'):
+            raise ValueError(f"Unknown command: {command}")
+        if self.running_display_mode == 'shell':
+            raise ValueError(f"{command} is not available in shell display mode")
+        
+        if command in ('pause', 'resume'):
+            self.paused = command == 'pause'
+            self.rotation_changed = True
+            self.wake_event.set()
+            self.log(f"[INFO] Rotation {'paused' if self.paused else 'resumed'} from the control socket")
+            return {"success": True, "message": f"Rotation {'paused' if self.paused else 'resumed'}"}
+        
+        index = request.get('index', self.current_tab if command == 'refresh' else None)
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(self.urls):
+            raise ValueError("index must be the position of a configured URL")
+        
+        if command == 'show':
+            self.requested_tab = index
+            self.rotation_changed = True
+            self.wake_event.set()
+            return {"success": True, "message": f"Showing tab {index + 1}"}
+        
+        if not await self.call(self.reload_tab, index):
+            return {"success": True, "message": f"Tab {index + 1} will be refreshed when it is shown"}
+        return {"success": True, "message": f"Refreshed tab {index + 1}"}
+        
+    def reload_tab(self, index):
+        """
+        Reload the tab at `index` now, loading it first if it is not live.
+        
+        A hidden tab is left for its next turn on backends that would have
+        to bring it to the front (can_prewarm is False).
+        
+        Returns:
+            bool: False if the refresh was left for the tab's next turn
+        """
+        if index >= len(self.urls):
+            return True
+        hidden = index != self.current_tab
+        if hidden and not self.browser.can_prewarm:
+            handle = self.tab_handles[index]
+            if handle:
+                self.deferred_reloads.add(handle)
+            # A tab that is not live is loaded fresh when shown anyway
+            self.log(f"[INFO] Refreshing tab {index + 1} on its next turn: {self.urls[index][:80]}")
+            return False
+        if self.ensure_tab(index):
+            return True
+        handle = self.tab_handles[index]
+        self.log(f"[INFO] Refreshing tab {index + 1}: {self.urls[index][:80]}")
+        self.set_tab_frozen(handle, False)
+        self.browser.reload(handle, background=hidden)
+        self.refresh_tracker.mark_loaded(self.urls[index])
+        return True
+        
+    def describe_state(self):
+        """Return a JSON-serializable snapshot of what the kiosk is doing"""
+        current_url = self.urls[self.current_tab] if self.current_tab < len(self.urls) else None
+        next_switch = None
+        if self.switch_deadline and not self.paused:
+            next_switch = round(max(0, self.switch_deadline - time.monotonic()), 1)
+        
+        tabs = []
+        if self.running_display_mode != 'shell':
+            tabs = [{"url": url,
+                     "loaded": bool(handle),
+                     "frozen": handle in self.frozen_tabs,
+                     "in_schedule": self.schedule.is_active(url),
+                     "available": self.breaker.is_available(url)}
+                    for url, handle in zip(self.urls, self.tab_handles)]
+        
+        return {
+            "display_mode": self.running_display_mode,
+            "browser_backend": self.browser_backend,
+            "paused": self.paused,
+            "current_tab": self.current_tab,
+            "current_url": current_url if self.running_display_mode != 'shell' else self.shell_url,
+            "next_switch_in": next_switch,
+            "tabs": tabs
+        }
+        
     def cleanup(self):
         """Clean up resources"""
         self.log("[INFO] Cleaning up resources...")
+        self.cleanup_browser()
         
-        if self.driver:
+    def cleanup_browser(self):
+        """Close the browser, if one was started"""
+        if self.browser:
             try:
-                self.driver.quit()
+                self.browser.quit()
                 self.log("[INFO] Browser closed successfully")
             except Exception as e:
                 self.log(f"[WARN] Error closing browser: {e}")
+            self.browser = None
+            
+    def _on_duty_done(self, task):
+        """Stop the controller if a duty ends on its own (e.g. no tabs left)"""
+        if not task.cancelled() and task.exception():
+            self.log(f"[ERROR] Unexpected error in main loop: {task.exception()}")
+        self.stop()
+        
+    async def main(self):
+        """Start the browser and run the controller's duties until stopped"""
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='browser')
+        self.stopped = asyncio.Event()
+        self.wake_event = asyncio.Event()
+        self.limits_changed = asyncio.Event()
+        
+        # Handle termination signals for clean shutdown
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self.loop.add_signal_handler(signum, self._handle_signal, signum)
+        # systemctl reload kiosk.service: restart the browser but keep the controller running
+        self.loop.add_signal_handler(signal.SIGHUP, self._handle_restart_signal, signal.SIGHUP)
+        
+        duties = []
+        try:
+            # Start browser
+            if not await self.call(self.start_browser):
+                self.log("[ERROR] Failed to start browser, exiting")
+                return
+            
+            # Apply config.json changes as soon as they are saved
+            self.config_watcher = ConfigWatcher(CONFIG_FILE, self._on_config_file_changed, log=self.log)
+            self.config_watcher.start(loop=self.loop)
+            
+            # Live commands from the web manager
+            if self.control_socket:
+                self.control_server = ControlServer(self.control_socket, self.handle_command, log=self.log)
+                try:
+                    await self.control_server.start()
+                except OSError as e:
+                    self.log(f"[WARN] Control socket unavailable: {e}")
+                    self.control_server = None
+            
+            # Tab cycling (or shell watching), and keeping Chromium's memory in check
+            self.running_display_mode = self.display_mode
+            cycle = self.watch_shell if self.display_mode == 'shell' else self.cycle_tabs
+            duties = [self.loop.create_task(cycle()), self.loop.create_task(self.govern_resources())]
+            for task in duties:
+                task.add_done_callback(self._on_duty_done)
+            
+            # Wait for stop signal (signal handlers set it)
+            await self.stopped.wait()
+            
+        finally:
+            self.stop_event.set()
+            for task in duties:
+                task.cancel()
+            await asyncio.gather(*duties, return_exceptions=True)
+            if self.config_watcher:
+                self.config_watcher.stop()
+            if self.control_server:
+                await self.control_server.stop()
+            await self.call(self.cleanup)
+            self.executor.shutdown()
                 
     def run(self):
         """Main run loop"""
@@ -275,29 +1341,15 @@ class KioskController:
         self.log("=" * 60)
         
         try:
-            # Start browser
-            if not self.start_browser():
-                self.log("[ERROR] Failed to start browser, exiting")
-                return
-            
-            # Start tab cycling in background thread
-            cycle_thread = threading.Thread(target=self.cycle_tabs, daemon=True)
-            cycle_thread.start()
-            
-            # Main loop - just wait for stop signal
-            while not self.stop_event.is_set():
-                time.sleep(1)
-                
+            asyncio.run(self.main())
         except KeyboardInterrupt:
             self.log("[INFO] Keyboard interrupt received")
         except Exception as e:
             self.log(f"[ERROR] Unexpected error in main loop: {e}")
         finally:
-            self.cleanup()
             self.log("[INFO] Kiosk Controller stopped")
             self.log("=" * 60)
 
-
 def main():
     """Entry point"""
     kiosk = KioskController()
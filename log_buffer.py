@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Log Buffer - Incremental kiosk service log tailing for the web manager
+A single long-lived `journalctl --follow` feeds a bounded in-memory ring
+buffer, so viewing logs costs only the lines written since the last look
+instead of a fork and a full re-read per request
+"""
+
+import re
+import json
+import time
+import threading
+import subprocess
+from collections import deque
+
+# Controller lines look like "[2024-01-01 12:00:00] [WARN] message"
+TIMESTAMP_PREFIX = re.compile(r'^\[\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\]\s*')
+LEVEL_TAG = re.compile(r'^\[(DEBUG|INFO|WARN|WARNING|ERROR)\]')
+
+LEVELS = ('DEBUG', 'INFO', 'WARN', 'ERROR')
+RESTART_DELAY = 5
+# journalctl missing or not runnable: retry with a doubling delay up to this
+MAX_RESTART_DELAY = 300
+
+
+def _level_of(message, priority=None):
+    """Level from the controller's [LEVEL] tag, else from the journal priority"""
+    match = LEVEL_TAG.match(message)
+    if match:
+        return 'WARN' if match.group(1) == 'WARNING' else match.group(1)
+    if priority is not None:
+        if priority <= 3:
+            return 'ERROR'
+        if priority == 4:
+            return 'WARN'
+        if priority == 7:
+            return 'DEBUG'
+    return 'INFO'
+
+
+class LogBuffer:
+    """
+    Bounded, thread-safe ring buffer of log entries.
+
+    Every entry gets an increasing id that clients pass back as `since` to
+    fetch only newer entries. A line identical to the one before it is not
+    stored again: the previous entry is replaced by one with a new id and
+    a higher "repeat" count, which names the entry it "replaces" so a
+    client that already shows it can update that line in place.
+    """
+
+    def __init__(self, capacity=2000):
+        self._entries = deque(maxlen=capacity)
+        self._last_id = 0
+        self._dropped_id = 0  # newest id pushed out of the full buffer
+        self._condition = threading.Condition()
+
+    def append(self, message, timestamp=None, priority=None):
+        """Add a line (safe to call from any thread)"""
+        message = TIMESTAMP_PREFIX.sub('', message.rstrip())
+        entry = {
+            "time": timestamp if timestamp is not None else time.time(),
+            "level": _level_of(message, priority),
+            "message": message,
+            "repeat": 1
+        }
+
+        with self._condition:
+            if self._entries and self._entries[-1]["message"] == message:
+                previous = self._entries.pop()
+                entry["repeat"] = previous["repeat"] + 1
+                entry["first_time"] = previous.get("first_time", previous["time"])
+                entry["replaces"] = previous["id"]
+            elif len(self._entries) == self._entries.maxlen:
+                self._dropped_id = self._entries[0]["id"]
+            self._last_id += 1
+            entry["id"] = self._last_id
+            self._entries.append(entry)
+            self._condition.notify_all()
+
+    def query(self, since=0, level=None, text=None, limit=None, wait=0):
+        """
+        Return entries newer than `since`, optionally filtered.
+
+        Args:
+            since (int): Id of the newest entry the caller already has (0 for all)
+            level (str): Minimum level, e.g. 'WARN' for warnings and errors
+            text (str): Only entries containing this text (case-insensitive)
+            limit (int): Only the newest `limit` matching entries
+            wait (float): Seconds to wait for a new entry if there is none yet
+
+        Returns:
+            dict: {"entries": [...], "cursor": id to pass as `since` next time,
+            "reset": True if `since` is from before the buffer was created
+            (e.g. the web manager restarted) and all entries are returned,
+            "truncated": True if entries after `since` were already dropped}
+        """
+        min_level = LEVELS.index(level.upper()) if level else 0
+        text = text.lower() if text else None
+
+        with self._condition:
+            reset = since > self._last_id
+            if reset:
+                since = 0
+            if wait > 0 and self._last_id == since:
+                self._condition.wait(wait)
+
+            truncated = since < self._dropped_id
+            entries = [dict(entry) for entry in self._entries
+                       if entry["id"] > since
+                       and LEVELS.index(entry["level"]) >= min_level
+                       and (text is None or text in entry["message"].lower())]
+            cursor = self._last_id
+
+        if limit:
+            entries = entries[-limit:]
+        return {"entries": entries, "cursor": cursor, "reset": reset, "truncated": truncated}
+
+
+class JournalFollower:
+    """
+    Follows a systemd unit's journal into a LogBuffer.
+
+    One `journalctl --follow --output=json` process runs for as long as the
+    follower does, started with the last `backfill` lines. If it exits it is
+    restarted after the last journal cursor it delivered, so nothing is read
+    twice and nothing is missed. If journalctl cannot be started the error
+    is logged once and it is retried with a growing delay.
+    """
+
+    def __init__(self, unit, buffer, backfill=500):
+        self.unit = unit
+        self.buffer = buffer
+        self.backfill = backfill
+        self._cursor = None
+        self._process = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Start following in the background (does nothing if already running)"""
+        with self._lock:
+            if self._thread is not None or self._stop_event.is_set():
+                return
+            self._thread = threading.Thread(target=self._follow, name='journal-follower', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop following and end the journalctl process"""
+        self._stop_event.set()
+        with self._lock:
+            process = self._process
+        if process and process.poll() is None:
+            process.terminate()
+
+    def _command(self):
+        command = ['journalctl', '-u', self.unit, '--follow', '--output=json', '--no-pager']
+        if self._cursor:
+            command.append(f'--after-cursor={self._cursor}')
+        else:
+            command += ['-n', str(self.backfill)]
+        return command
+
+    def _follow(self):
+        delay = RESTART_DELAY
+        failing = False
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    process = subprocess.Popen(self._command(), stdout=subprocess.PIPE,
+                                               stderr=subprocess.DEVNULL)
+                except OSError as e:
+                    if not failing:
+                        self.buffer.append(f"[ERROR] Cannot read the {self.unit} journal: {e}")
+                        failing = True
+                    if self._stop_event.wait(delay):
+                        return
+                    delay = min(delay * 2, MAX_RESTART_DELAY)
+                    continue
+
+                if failing:
+                    self.buffer.append(f"[INFO] Reading the {self.unit} journal again")
+                    failing = False
+                delay = RESTART_DELAY
+                with self._lock:
+                    self._process = process
+                with process:
+                    for line in process.stdout:
+                        self._read_record(line)
+
+                if self._stop_event.wait(RESTART_DELAY):
+                    return
+        finally:
+            # Let start() run a new follower if this one ever ends unexpectedly
+            with self._lock:
+                self._thread = None
+                self._process = None
+
+    def _read_record(self, line):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return
+
+        message = record.get('MESSAGE')
+        if isinstance(message, list):
+            # Non-UTF-8 messages are exported as byte arrays
+            message = bytes(message).decode('utf-8', errors='replace')
+        if message is None:
+            return
+
+        try:
+            timestamp = int(record['__REALTIME_TIMESTAMP']) / 1e6
+        except (KeyError, ValueError):
+            timestamp = None
+        try:
+            priority = int(record['PRIORITY'])
+        except (KeyError, ValueError):
+            priority = None
+
+        self._cursor = record.get('__CURSOR', self._cursor)
+        self.buffer.append(message, timestamp=timestamp, priority=priority)
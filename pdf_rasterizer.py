@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+PDF Rasterizer - Server-side page rendering for PDF viewers
+Pre-renders every page (and page pair) of an uploaded PDF to images so the
+kiosk browser can show plain <img> tiles instead of running PDF.js on the Pi
+"""
+
+import os
+import json
+import shutil
+import subprocess
+import threading
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is optional - without it pages stay PNG and pairs are not composited
+    Image = None
+
+# Width of a single rendered page in pixels. Two pages side by side plus the
+# gap fill the viewer's 1800px max width on a 1080p kiosk display.
+RENDER_PAGE_WIDTH = 880
+PAIR_GAP = 20
+WEBP_QUALITY = 85
+
+PDFTOPPM_BINARY = "pdftoppm"
+PDFINFO_BINARY = "pdfinfo"
+MANIFEST_NAME = "manifest.json"
+
+# Render status per PDF filename, e.g. {"handbook.pdf": {"state": "rendering", ...}}
+_status = {}
+_status_lock = threading.Lock()
+
+# One document at a time; each document fans out over all but one CPU core,
+# leaving a core for the kiosk browser and the web manager
+_job_queue = ThreadPoolExecutor(max_workers=1)
+
+
+def default_workers():
+    """Return the number of render processes to use (CPU cores minus one, at least one)"""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def _pool_context():
+    # Render workers are started from a clean process: forking the threaded
+    # web manager would copy its locks and threads mid-use into each worker
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def pages_dir_for(pdf_path):
+    """Return the directory holding the rendered images for a PDF"""
+    pdf_path = Path(pdf_path)
+    return pdf_path.parent / f"{pdf_path.stem}_pages"
+
+
+def image_format():
+    """Return the image format used for rendered pages ('webp' or 'png')"""
+    if Image is not None and features.check('webp'):
+        return 'webp'
+    return 'png'
+
+
+def get_page_count(pdf_path):
+    """Return the number of pages in a PDF using pdfinfo"""
+    result = subprocess.run(
+        [PDFINFO_BINARY, str(pdf_path)],
+        capture_output=True,
+        text=True,
+        timeout=30
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith('Pages:'):
+            return int(line.split(':', 1)[1])
+    raise ValueError(f"Could not read page count: {result.stderr.strip()}")
+
+
+def _render_page(pdf_path, page_num, out_dir, width, fmt):
+    """
+    Render one PDF page to an image (runs inside a pool worker).
+
+    Returns:
+        dict: Manifest entry with file name and pixel size
+    """
+    out_dir = Path(out_dir)
+    prefix = out_dir / f"page_{page_num:04d}"
+    subprocess.run(
+        [PDFTOPPM_BINARY, '-png', '-singlefile',
+         '-f', str(page_num), '-l', str(page_num),
+         '-scale-to-x', str(width), '-scale-to-y', '-1',
+         str(pdf_path), str(prefix)],
+        check=True,
+        capture_output=True,
+        timeout=120
+    )
+    png_path = prefix.with_suffix('.png')
+
+    if Image is None:
+        return {"file": png_path.name, "width": width, "height": None}
+
+    with Image.open(png_path) as img:
+        size = img.size
+        if fmt == 'webp':
+            webp_path = prefix.with_suffix('.webp')
+            img.save(webp_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+
+    if fmt == 'webp':
+        png_path.unlink()
+        return {"file": webp_path.name, "width": size[0], "height": size[1]}
+    return {"file": png_path.name, "width": size[0], "height": size[1]}
+
+
+def _render_pair(out_dir, left, right, pair_num, fmt):
+    """Composite two rendered pages side by side into one image (runs inside a pool worker)"""
+    out_dir = Path(out_dir)
+    images = [Image.open(out_dir / entry['file']) for entry in (left, right) if entry]
+    try:
+        width = sum(img.width for img in images) + PAIR_GAP * (len(images) - 1)
+        height = max(img.height for img in images)
+
+        # Transparent gap so the viewer background shows between the pages
+        pair = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        x = 0
+        for img in images:
+            pair.paste(img.convert('RGBA'), (x, 0))
+            x += img.width + PAIR_GAP
+
+        pair_path = out_dir / f"pair_{pair_num:04d}.{fmt}"
+        if fmt == 'webp':
+            pair.save(pair_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+        else:
+            pair.save(pair_path, 'PNG', optimize=True)
+    finally:
+        for img in images:
+            img.close()
+
+    pages = [entry['page'] for entry in (left, right) if entry]
+    return {"file": pair_path.name, "width": width, "height": height, "pages": pages}
+
+
+def rasterize_pdf(pdf_path, width=RENDER_PAGE_WIDTH, workers=None, progress=None):
+    """
+    Render every page and page pair of a PDF using a multi-core process pool.
+
+    Images are written to "<name>_pages/" next to the PDF along with a
+    manifest.json that the generated viewer reads to switch to image mode.
+    The manifest is written last, so a partially rendered directory is
+    never picked up by the viewer.
+
+    Args:
+        pdf_path (Path or str): Path to the PDF file
+        width (int): Width of a single rendered page in pixels
+        workers (int): Number of worker processes (default: default_workers())
+        progress (callable): Optional callback(done, total) for status updates
+
+    Returns:
+        dict: The written manifest
+    """
+    pdf_path = Path(pdf_path)
+    out_dir = pages_dir_for(pdf_path)
+    fmt = image_format()
+
+    # Start from a clean directory so stale pages from an older upload never mix in
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True)
+
+    page_count = get_page_count(pdf_path)
+    pair_count = (page_count + 1) // 2 if Image is not None else 0
+    total = page_count + pair_count
+    done = 0
+
+    workers = min(workers or default_workers(), default_workers())
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        page_futures = [
+            pool.submit(_render_page, str(pdf_path), page_num, str(out_dir), width, fmt)
+            for page_num in range(1, page_count + 1)
+        ]
+        pages = []
+        for page_num, future in enumerate(page_futures, start=1):
+            entry = future.result()
+            entry['page'] = page_num
+            pages.append(entry)
+            done += 1
+            if progress:
+                progress(done, total)
+
+        pairs = []
+        if pair_count:
+            pair_futures = [
+                pool.submit(_render_pair, str(out_dir), pages[i],
+                            pages[i + 1] if i + 1 < page_count else None, i // 2 + 1, fmt)
+                for i in range(0, page_count, 2)
+            ]
+            for future in pair_futures:
+                pairs.append(future.result())
+                done += 1
+                if progress:
+                    progress(done, total)
+
+    stat = pdf_path.stat()
+    manifest = {
+        "source": pdf_path.name,
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+        "page_count": page_count,
+        "page_width": width,
+        "format": fmt,
+        "pages": pages,
+        "pairs": pairs
+    }
+
+    tmp_path = out_dir / f".{MANIFEST_NAME}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, out_dir / MANIFEST_NAME)
+
+    return manifest
+
+
+def _set_status(name, **fields):
+    with _status_lock:
+        _status.setdefault(name, {}).update(fields)
+
+
+def get_render_status(pdf_path):
+    """
+    Return the render status for a PDF.
+
+    Falls back to checking for a manifest on disk so PDFs rendered before
+    the web manager restarted still report as done.
+    """
+    pdf_path = Path(pdf_path)
+    with _status_lock:
+        if pdf_path.name in _status:
+            return dict(_status[pdf_path.name])
+    if is_rendered(pdf_path):
+        return {"state": "done"}
+    return None
+
+
+def get_render_statuses():
+    """Return the status of every render started since the web manager started, by PDF file name"""
+    with _status_lock:
+        return {name: dict(status) for name, status in _status.items()}
+
+
+def _run_job(pdf_path):
+    name = pdf_path.name
+    _set_status(name, state="rendering", done=0, total=None, error=None)
+
+    def progress(done, total):
+        _set_status(name, done=done, total=total)
+
+    try:
+        manifest = rasterize_pdf(pdf_path, progress=progress)
+        _set_status(name, state="done", page_count=manifest['page_count'])
+        print(f"✓ Rasterized {name}: {manifest['page_count']} pages ({manifest['format']})")
+    except Exception as e:
+        # Leave no half-rendered directory behind; the viewer falls back to PDF.js
+        shutil.rmtree(pages_dir_for(pdf_path), ignore_errors=True)
+        _set_status(name, state="error", error=str(e))
+        print(f"✗ Error rasterizing {name}: {e}")
+
+
+def rasterize_in_background(pdf_path):
+    """Queue a PDF for background rasterization and return immediately"""
+    pdf_path = Path(pdf_path)
+    shutil.rmtree(pages_dir_for(pdf_path), ignore_errors=True)
+    _set_status(pdf_path.name, state="queued", done=0, total=None, error=None)
+    _job_queue.submit(_run_job, pdf_path)
+
+
+def is_rendered(pdf_path):
+    """
+    Check whether a PDF has a complete set of rendered images.
+
+    The manifest records the size and modification time of the PDF it was
+    rendered from; if the file has changed since (e.g. replaced outside the
+    web manager) the images are stale and this returns False.
+    """
+    pdf_path = Path(pdf_path)
+    try:
+        with open(pages_dir_for(pdf_path) / MANIFEST_NAME) as f:
+            manifest = json.load(f)
+        stat = pdf_path.stat()
+    except (OSError, ValueError):
+        return False
+    return (manifest.get('source_size') == stat.st_size
+            and manifest.get('source_mtime') == stat.st_mtime)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        print("Usage: python3 pdf_rasterizer.py <file.pdf>")
+        sys.exit(1)
+
+    result = rasterize_pdf(sys.argv[1], progress=lambda done, total: print(f"  {done}/{total}"))
+    print(f"✓ Rendered {result['page_count']} pages to {pages_dir_for(sys.argv[1])}")
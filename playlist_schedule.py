@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Playlist Schedule - Per-URL dwell times and time-of-day windows
+Decides how long each page stays on screen and which pages are in rotation
+
+Configured in config.json alongside the refresh policies:
+
+    "url_settings": {
+        "https://time.is/clock": {"dwell": 15},
+        "http://localhost:5000/html/menu.html": {
+            "schedule": {"start": "10:30", "end": "13:30", "days": ["mon", "tue", "wed", "thu", "fri"]}
+        },
+        "file:///home/annkiosk/announcements_kiosk/html/Night_Shift.html": {
+            "schedule": [{"start": "22:00", "end": "06:00"}]
+        }
+    }
+
+Pages without a "dwell" use cycle_delay; pages without a "schedule" are
+always in rotation.
+"""
+
+from datetime import datetime, time as dt_time
+
+DAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def _parse_time(value):
+    try:
+        hours, minutes = (int(part) for part in value.split(':'))
+        return dt_time(hours, minutes)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Schedule times must be \"HH:MM\", got {value!r}")
+
+
+class TimeWindow:
+    """
+    A daily time-of-day window, optionally limited to some weekdays.
+
+    A window whose end is before its start runs overnight; its days refer
+    to the day it starts on.
+    """
+
+    def __init__(self, start, end, days=None):
+        self.start = start
+        self.end = end
+        self.days = days
+
+    @classmethod
+    def from_config(cls, spec):
+        """
+        Build a window from a config value like {"start": "07:00", "end": "17:00"}.
+        Raises ValueError for anything else so bad config is reported on load.
+        """
+        if not isinstance(spec, dict):
+            raise ValueError(f"Schedule window must be an object, got {spec!r}")
+
+        start = _parse_time(spec.get('start', '00:00'))
+        end = _parse_time(spec.get('end', '23:59'))
+
+        days = spec.get('days')
+        if days is not None:
+            days = [str(day).lower()[:3] for day in days]
+            unknown = [day for day in days if day not in DAY_NAMES]
+            if unknown:
+                raise ValueError(f"Unknown schedule day(s) {unknown} (expected {', '.join(DAY_NAMES)})")
+            days = {DAY_NAMES.index(day) for day in days}
+
+        return cls(start=start, end=end, days=days)
+
+    def contains(self, now):
+        """Check whether a datetime falls inside the window"""
+        current = now.time()
+        if self.start <= self.end:
+            return self.start <= current < self.end and self._day_ok(now.weekday())
+        # Overnight: the part after midnight belongs to the previous day's window
+        if current >= self.start:
+            return self._day_ok(now.weekday())
+        if current < self.end:
+            return self._day_ok((now.weekday() - 1) % 7)
+        return False
+
+    def _day_ok(self, weekday):
+        return self.days is None or weekday in self.days
+
+    def __repr__(self):
+        days = '' if self.days is None else ' ' + ','.join(DAY_NAMES[day] for day in sorted(self.days))
+        return f"{self.start:%H:%M}-{self.end:%H:%M}{days}"
+
+
+class PlaylistSchedule:
+    """
+    Per-URL dwell times and active windows for the rotation.
+
+    Like RefreshTracker, keyed by the configured URL.
+    """
+
+    def __init__(self):
+        self.default_dwell = 10
+        self.dwell = {}
+        self.windows = {}
+
+    def configure(self, config):
+        """
+        Load dwell times and windows from a parsed config.json dict.
+
+        Raises:
+            ValueError: If any dwell time or window is invalid
+        """
+        default_dwell = float(config.get('cycle_delay', 10))
+
+        dwell = {}
+        windows = {}
+        for url, settings in (config.get('url_settings') or {}).items():
+            if not isinstance(settings, dict):
+                continue
+            if 'dwell' in settings:
+                seconds = float(settings['dwell'])
+                if seconds <= 0:
+                    raise ValueError(f"dwell must be positive (got {settings['dwell']!r} for {url})")
+                dwell[url] = seconds
+            if 'schedule' in settings:
+                specs = settings['schedule']
+                if isinstance(specs, dict):
+                    specs = [specs]
+                windows[url] = [TimeWindow.from_config(spec) for spec in specs]
+
+        self.default_dwell = default_dwell
+        self.dwell = dwell
+        self.windows = windows
+
+    def dwell_for(self, url):
+        """Return how many seconds a URL stays on screen"""
+        return self.dwell.get(url, self.default_dwell)
+
+    def is_active(self, url, now=None):
+        """Check whether a URL is in rotation at the given (local) time"""
+        windows = self.windows.get(url)
+        if not windows:
+            return True
+        now = now or datetime.now()
+        return any(window.contains(now) for window in windows)
+
+    def next_index(self, urls, current, now=None, available=None):
+        """
+        Return the index of the next URL in rotation after `current`.
+
+        Args:
+            available (callable): Optional extra check, available(url) -> bool,
+                for URLs that are in their window but should be skipped
+
+        Returns `current` itself if no other URL is active, so the page on
+        screen stays up until something else comes into its window.
+        """
+        now = now or datetime.now()
+        for step in range(1, len(urls) + 1):
+            index = (current + step) % len(urls)
+            if self.is_active(urls[index], now) and (available is None or available(urls[index])):
+                return index
+        return current
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Refresh Policy - Per-URL refresh rules for the kiosk controller
+Decides whether a tab needs reloading when it comes up in the rotation
+
+Policies are configured in config.json:
+
+    "default_refresh": "always",
+    "url_settings": {
+        "https://time.is/clock": {"refresh": "never"},
+        "https://www.windy.com/...": {"refresh": {"mode": "ttl", "max_age": 1800}},
+        "http://localhost:5000/html/menu.html": {"refresh": "conditional"},
+        "https://publish.smartsheet.com/...": {"refresh": {"mode": "cycles", "every": 5}}
+    }
+"""
+
+import time
+import urllib.request
+import urllib.error
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+
+REFRESH_MODES = ('always', 'never', 'cycles', 'ttl', 'conditional')
+
+# Timeout for the HEAD request behind conditional refreshes
+CONDITIONAL_TIMEOUT = 5
+
+
+class RefreshPolicy:
+    """
+    A single refresh rule.
+
+    Modes:
+        always      - reload every time the tab is shown (original behaviour)
+        never       - load once, never reload
+        cycles      - reload every `every` times the tab is shown
+        ttl         - reload once the page is older than `max_age` seconds
+        conditional - reload only when a HEAD/ETag check shows the content changed
+    """
+
+    def __init__(self, mode='always', every=1, max_age=None):
+        self.mode = mode
+        self.every = every
+        self.max_age = max_age
+
+    @classmethod
+    def from_config(cls, spec):
+        """
+        Build a policy from a config value.
+
+        Accepts a mode name ("never") or a dict ({"mode": "ttl", "max_age": 600}).
+        Raises ValueError for anything else so bad config is reported on load.
+        """
+        if isinstance(spec, str):
+            spec = {"mode": spec}
+        if not isinstance(spec, dict):
+            raise ValueError(f"Refresh policy must be a string or object, got {spec!r}")
+
+        mode = spec.get('mode', 'always')
+        if mode not in REFRESH_MODES:
+            raise ValueError(f"Unknown refresh mode '{mode}' (expected one of {', '.join(REFRESH_MODES)})")
+
+        every = int(spec.get('every', 1))
+        if mode == 'cycles' and every <= 0:
+            raise ValueError("Refresh 'every' must be a positive integer")
+
+        max_age = spec.get('max_age')
+        if mode == 'ttl':
+            if max_age is None or float(max_age) <= 0:
+                raise ValueError("Refresh mode 'ttl' requires a positive 'max_age' in seconds")
+            max_age = float(max_age)
+
+        return cls(mode=mode, every=every, max_age=max_age)
+
+    def __repr__(self):
+        if self.mode == 'cycles':
+            return f"cycles(every={self.every})"
+        if self.mode == 'ttl':
+            return f"ttl(max_age={self.max_age:g}s)"
+        return self.mode
+
+
+class RefreshTracker:
+    """
+    Tracks per-URL refresh state and applies the configured policies.
+
+    The tracker is keyed by the configured URL (not the browser's current
+    URL, which may have been redirected).
+    """
+
+    def __init__(self):
+        self.default_policy = RefreshPolicy()
+        self.policies = {}
+        self._state = {}
+
+    def configure(self, config):
+        """
+        Load policies from a parsed config.json dict.
+
+        Raises:
+            ValueError: If any policy is invalid
+        """
+        default_policy = RefreshPolicy.from_config(config.get('default_refresh', 'always'))
+
+        policies = {}
+        for url, settings in (config.get('url_settings') or {}).items():
+            if isinstance(settings, dict) and 'refresh' in settings:
+                policies[url] = RefreshPolicy.from_config(settings['refresh'])
+
+        self.default_policy = default_policy
+        self.policies = policies
+
+        # Forget state for URLs that are no longer configured
+        urls = set(config.get('urls', []))
+        self._state = {url: state for url, state in self._state.items() if url in urls}
+
+    def policy_for(self, url):
+        """Return the policy that applies to a URL"""
+        return self.policies.get(url, self.default_policy)
+
+    def _get_state(self, url):
+        return self._state.setdefault(url, {
+            "loaded_at": time.monotonic(),
+            "shows": 0,
+            "etag": None,
+            "last_modified": None
+        })
+
+    def mark_loaded(self, url):
+        """Record that a URL was just loaded or reloaded"""
+        state = self._get_state(url)
+        state['loaded_at'] = time.monotonic()
+        state['shows'] = 0
+
+    def should_refresh(self, url):
+        """
+        Decide whether the tab for `url` should be reloaded now.
+
+        Called once each time the tab is shown; counts the show for
+        cycle-based policies.
+        """
+        policy = self.policy_for(url)
+        state = self._get_state(url)
+        state['shows'] += 1
+
+        if policy.mode == 'always':
+            return True
+        if policy.mode == 'never':
+            return False
+        if policy.mode == 'cycles':
+            return state['shows'] >= policy.every
+        if policy.mode == 'ttl':
+            return time.monotonic() - state['loaded_at'] >= policy.max_age
+        if policy.mode == 'conditional':
+            return self._content_changed(url, state)
+        return True
+
+    def _content_changed(self, url, state):
+        """Check a URL's validators without downloading the body"""
+        parsed = urlparse(url)
+
+        if parsed.scheme == 'file':
+            try:
+                mtime = Path(unquote(parsed.path)).stat().st_mtime
+            except OSError:
+                return False
+            changed = state['last_modified'] is not None and mtime != state['last_modified']
+            state['last_modified'] = mtime
+            return changed
+
+        request = urllib.request.Request(url, method='HEAD')
+        if state['etag']:
+            request.add_header('If-None-Match', state['etag'])
+        if state['last_modified']:
+            request.add_header('If-Modified-Since', state['last_modified'])
+
+        try:
+            with urllib.request.urlopen(request, timeout=CONDITIONAL_TIMEOUT) as response:
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except urllib.error.HTTPError:
+            # 304 Not Modified; any other error means keep what's on screen
+            return False
+        except Exception:
+            # Offline or unreachable - reloading would only show an error page
+            return False
+
+        first_check = state['etag'] is None and state['last_modified'] is None
+        if etag is None and last_modified is None:
+            # Server gives us nothing to compare, so fall back to always refreshing
+            return True
+
+        changed = (etag, last_modified) != (state['etag'], state['last_modified'])
+        state['etag'] = etag
+        state['last_modified'] = last_modified
+
+        # The first check only records validators for the page loaded at startup
+        return changed and not first_check
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Resource Governor - Memory and CPU sampling for the kiosk browser
+Reads RSS and CPU time for Chromium's process tree straight from /proc, so
+the controller can act on leaks before the Pi runs out of memory
+"""
+
+import os
+import time
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+# Per-tab memory as reported by the page itself (Chromium-only API)
+TAB_MEMORY_EXPRESSION = "performance.memory ? performance.memory.usedJSHeapSize : null"
+
+
+def _read_stat(pid):
+    """Return (ppid, cpu_ticks) for a process, or None if it has exited"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces; fields resume after its closing ')'
+    fields = data[data.rindex(b')') + 2:].split()
+    ppid = int(fields[1])
+    cpu_ticks = int(fields[11]) + int(fields[12])  # utime + stime
+    return ppid, cpu_ticks
+
+
+def _read_rss(pid):
+    try:
+        with open(f'/proc/{pid}/statm', 'rb') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _process_type(pid):
+    """Return Chromium's --type= for a process ('browser' for the main process)"""
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            args = f.read().split(b'\0')
+    except OSError:
+        return 'unknown'
+    for arg in args:
+        if arg.startswith(b'--type='):
+            return arg[len(b'--type='):].decode(errors='replace')
+    return 'browser'
+
+
+def process_tree(root_pid):
+    """Return the pids of a process and all of its descendants"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        stat = _read_stat(int(entry))
+        if stat:
+            children.setdefault(stat[0], []).append(int(entry))
+
+    pids = []
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+class ProcessSampler:
+    """
+    Samples RSS and CPU usage of a process tree.
+
+    CPU percentages are computed from the CPU time used since the previous
+    sample, so the first sample reports 0% for every process.
+    """
+
+    def __init__(self):
+        self._last_ticks = {}
+        self._last_time = None
+
+    def sample(self, root_pid):
+        """
+        Returns:
+            dict: {"rss": total bytes, "cpu": total percent of one core,
+                   "processes": [{"pid", "type", "rss", "cpu"}, ...]}
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_time if self._last_time else None
+        processes = []
+        ticks = {}
+
+        for pid in process_tree(root_pid):
+            stat = _read_stat(pid)
+            if stat is None:
+                continue
+            ticks[pid] = stat[1]
+            cpu = 0.0
+            if elapsed and pid in self._last_ticks:
+                cpu = (stat[1] - self._last_ticks[pid]) / CLOCK_TICKS / elapsed * 100
+            processes.append({"pid": pid, "type": _process_type(pid), "rss": _read_rss(pid), "cpu": cpu})
+
+        self._last_ticks = ticks
+        self._last_time = now
+        return {
+            "rss": sum(process['rss'] for process in processes),
+            "cpu": sum(process['cpu'] for process in processes),
+            "processes": processes
+        }
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tab Health - Crash, hang and error-page detection for kiosk tabs
+Classifies a tab after it is shown and keeps a per-URL circuit breaker so
+pages that keep failing are skipped instead of blanking the screen
+"""
+
+import time
+
+# Chromium shows network errors (DNS, offline, refused) on this internal page
+ERROR_PAGE_PREFIX = 'chrome-error://'
+HEALTH_EXPRESSION = "[location.href, document.readyState]"
+HEALTH_TIMEOUT = 5
+
+HEALTHY = 'ok'
+NETWORK_ERROR = 'network_error'
+UNRESPONSIVE = 'unresponsive'  # crashed ("Aw, Snap!") or hung renderer
+
+
+def probe_tab(browser, tab, timeout=HEALTH_TIMEOUT):
+    """
+    Check whether a tab is showing its page.
+
+    A renderer that has crashed or is stuck in a script cannot evaluate
+    anything, so a failed or timed-out probe means the tab is unresponsive.
+
+    Returns:
+        str: HEALTHY, NETWORK_ERROR or UNRESPONSIVE
+    """
+    try:
+        href, _state = browser.evaluate(tab, HEALTH_EXPRESSION, timeout=timeout)
+    except Exception:
+        return UNRESPONSIVE
+    if href.startswith(ERROR_PAGE_PREFIX):
+        return NETWORK_ERROR
+    return HEALTHY
+
+
+class CircuitBreaker:
+    """
+    Per-URL failure tracking with exponential backoff.
+
+    After `threshold` consecutive failures a URL is taken out of rotation
+    for `base_delay` seconds, doubling with every further failure up to
+    `max_delay`. Once the delay has passed the URL gets one more try; a
+    healthy showing closes the breaker again.
+    """
+
+    def __init__(self, threshold=3, base_delay=60, max_delay=1800):
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._failures = {}
+        self._retry_at = {}
+
+    def record_success(self, url):
+        """Reset a URL's failure count"""
+        self._failures.pop(url, None)
+        self._retry_at.pop(url, None)
+
+    def record_failure(self, url):
+        """
+        Count a failure for a URL.
+
+        Returns:
+            float: Seconds the URL is now out of rotation (0 if it stays in)
+        """
+        failures = self._failures.get(url, 0) + 1
+        self._failures[url] = failures
+        if failures < self.threshold:
+            return 0
+
+        delay = min(self.base_delay * 2 ** (failures - self.threshold), self.max_delay)
+        self._retry_at[url] = time.monotonic() + delay
+        return delay
+
+    def is_available(self, url):
+        """Check whether a URL may be shown (breaker closed or due for a retry)"""
+        retry_at = self._retry_at.get(url)
+        return retry_at is None or time.monotonic() >= retry_at
+
+    def forget(self, urls):
+        """Drop state for URLs that are no longer configured"""
+        for url in list(self._failures):
+            if url not in urls:
+                self.record_success(url)
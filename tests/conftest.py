@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The kiosk modules live flat in the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_cdp_server import FakeCDPServer  # noqa: E402
+
+
+@pytest.fixture
+def cdp_server():
+    server = FakeCDPServer()
+    yield server
+    server.close()
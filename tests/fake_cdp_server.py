@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Fake CDP Server - Stand-in for Chromium's DevTools endpoint in tests
+Serves /json/version and the browser/page websockets on localhost, answers
+the Target.*, Page.* and Runtime.* commands the kiosk uses and records
+every command it receives
+"""
+
+import json
+import socket
+import itertools
+import threading
+
+from cdp import (
+    OP_TEXT, OP_CONTINUATION, OP_CLOSE, OP_PING, OP_PONG,
+    encode_frame, read_frame, websocket_accept_key
+)
+
+NO_REPLY = object()
+
+
+class FakeCDPError(Exception):
+    """Raise from a handler to answer with a CDP error"""
+
+
+class FakeCDPServer:
+    """
+    A DevTools endpoint with an in-memory list of page targets.
+
+    Tests can change how it answers:
+        handlers[method]   function(path, params) -> result dict, NO_REPLY
+                           or raise FakeCDPError
+        noise              messages sent before every reply (events,
+                           replies to other ids)
+        fragment           send replies as several frames
+        ping_first         send a ping before every reply
+        bad_accept_key     answer handshakes with a wrong accept key
+    """
+
+    def __init__(self):
+        self.targets = {}
+        self.active_target = None
+        self.commands = []  # (path, method, params)
+        self.pongs = []
+        self.handlers = {}
+        self.noise = []
+        self.fragment = False
+        self.ping_first = False
+        self.bad_accept_key = False
+        self.evaluate_results = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._connections = []
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(16)
+        self.port = self._sock.getsockname()[1]
+        self.browser_ws_url = f"ws://127.0.0.1:{self.port}/devtools/browser/fake"
+        self.add_target('about:blank')
+
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    def add_target(self, url):
+        """Add a page target and return its id"""
+        target_id = f"TARGET{next(self._ids)}"
+        self.targets[target_id] = {"targetId": target_id, "type": "page", "url": url, "title": ""}
+        return target_id
+
+    def methods(self):
+        """Names of the commands received so far"""
+        return [method for _path, method, _params in self.commands]
+
+    def close(self):
+        self._sock.close()
+        for conn in list(self._connections):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+                conn.close()
+            except OSError:
+                pass
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self._connections.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        rfile = conn.makefile('rb')
+        try:
+            request_line = rfile.readline().decode('latin-1')
+            headers = {}
+            while True:
+                line = rfile.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            path = request_line.split(' ')[1] if ' ' in request_line else '/'
+            if path.startswith('/json/version'):
+                body = json.dumps({"Browser": "FakeChrome/1.0", "webSocketDebuggerUrl": self.browser_ws_url})
+                conn.sendall((
+                    "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n{body}"
+                ).encode())
+                return
+            if path.startswith('/devtools/'):
+                accept = websocket_accept_key(headers.get('sec-websocket-key', ''))
+                if self.bad_accept_key:
+                    accept = 'wrong'
+                conn.sendall((
+                    "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                    f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n"
+                ).encode())
+                self._serve_websocket(conn, rfile, path)
+                return
+            conn.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            rfile.close()
+            conn.close()
+
+    def _serve_websocket(self, conn, rfile, path):
+        while True:
+            _fin, opcode, payload = read_frame(rfile)
+            if opcode == OP_CLOSE:
+                return
+            if opcode == OP_PONG:
+                self.pongs.append(payload)
+                continue
+
+            message = json.loads(payload)
+            with self._lock:
+                self.commands.append((path, message['method'], message.get('params', {})))
+            reply = self._answer(path, message)
+            if reply is NO_REPLY:
+                continue
+
+            for noise in self.noise:
+                conn.sendall(encode_frame(json.dumps(noise).encode(), mask=False))
+            if self.ping_first:
+                conn.sendall(encode_frame(b'are you there', OP_PING, mask=False))
+            self._send(conn, json.dumps(reply).encode())
+
+    def _send(self, conn, data):
+        if not self.fragment or len(data) < 3:
+            conn.sendall(encode_frame(data, mask=False))
+            return
+        # Split into three frames: text, continuation (not final), continuation (final)
+        thirds = [data[:len(data) // 3], data[len(data) // 3:2 * len(data) // 3], data[2 * len(data) // 3:]]
+        for index, part in enumerate(thirds):
+            frame = bytearray(encode_frame(part, OP_TEXT if index == 0 else OP_CONTINUATION, mask=False))
+            if index < 2:
+                frame[0] &= 0x7F  # clear FIN
+            conn.sendall(bytes(frame))
+
+    def _answer(self, path, message):
+        method = message['method']
+        params = message.get('params', {})
+        handler = self.handlers.get(method) or getattr(self, '_' + method.replace('.', '_'), None)
+        try:
+            if handler is None:
+                raise FakeCDPError(f"'{method}' wasn't found")
+            result = handler(path, params)
+        except FakeCDPError as e:
+            return {"id": message['id'], "error": {"code": -32000, "message": str(e)}}
+        if result is NO_REPLY:
+            return NO_REPLY
+        return {"id": message['id'], "result": result}
+
+    def _target(self, target_id):
+        if target_id not in self.targets:
+            raise FakeCDPError("No target with given id found")
+        return self.targets[target_id]
+
+    def _page_target(self, path):
+        return self._target(path.rsplit('/', 1)[-1])
+
+    # Browser-level commands
+
+    def _Target_getTargets(self, path, params):
+        return {"targetInfos": list(self.targets.values())}
+
+    def _Target_createTarget(self, path, params):
+        return {"targetId": self.add_target(params.get('url', 'about:blank'))}
+
+    def _Target_closeTarget(self, path, params):
+        self._target(params.get('targetId'))
+        del self.targets[params['targetId']]
+        return {"success": True}
+
+    def _Target_activateTarget(self, path, params):
+        self._target(params.get('targetId'))
+        self.active_target = params['targetId']
+        return {}
+
+    def _Target_getTargetInfo(self, path, params):
+        return {"targetInfo": self._target(params.get('targetId'))}
+
+    def _Browser_close(self, path, params):
+        return {}
+
+    # Page-level commands
+
+    def _Page_navigate(self, path, params):
+        self._page_target(path)['url'] = params['url']
+        return {"frameId": "FRAME"}
+
+    def _Page_reload(self, path, params):
+        self._page_target(path)
+        return {}
+
+    def _Page_setWebLifecycleState(self, path, params):
+        self._page_target(path)['lifecycle'] = params['state']
+        return {}
+
+    def _Runtime_evaluate(self, path, params):
+        self._page_target(path)
+        value = self.evaluate_results.get(params['expression'])
+        if isinstance(value, FakeCDPError):
+            return {"result": {"type": "object"},
+                    "exceptionDetails": {"text": "Uncaught", "exception": {"description": str(value)}}}
+        return {"result": {"type": "string" if isinstance(value, str) else "object", "value": value}}
@@ -0,0 +1,248 @@
+import io
+import struct
+
+import pytest
+
+from cdp import (
+    CDPConnection, CDPError, OP_TEXT,
+    encode_frame, read_frame, websocket_accept_key, http_json
+)
+from browser_backends import CDPBackend
+from fake_cdp_server import FakeCDPError, NO_REPLY
+
+
+# Framing
+
+def test_accept_key_matches_rfc_example():
+    # RFC 6455 section 1.3
+    assert websocket_accept_key('dGhlIHNhbXBsZSBub25jZQ==') == 's3pPLMBiTxaQ9kYGzzhZRbK+xOo='
+
+
+def test_client_frames_are_masked():
+    payload = b'{"id": 1, "method": "Page.reload"}'
+    frame = encode_frame(payload)
+
+    assert frame[0] == 0x80 | OP_TEXT
+    assert frame[1] & 0x80, "mask bit must be set on client frames"
+    assert payload not in frame
+    assert read_frame(io.BytesIO(frame)) == (True, OP_TEXT, payload)
+
+
+def test_server_frames_are_not_masked():
+    frame = encode_frame(b'hello', mask=False)
+    assert frame == bytes([0x80 | OP_TEXT, 5]) + b'hello'
+
+
+@pytest.mark.parametrize('length, header_size, length_bytes', [
+    (0, 2, b''),
+    (125, 2, b''),
+    (126, 4, struct.pack('!H', 126)),
+    (65535, 4, struct.pack('!H', 65535)),
+    (65536, 10, struct.pack('!Q', 65536)),
+    (200000, 10, struct.pack('!Q', 200000)),
+])
+@pytest.mark.parametrize('mask', [True, False])
+def test_payload_lengths(length, header_size, length_bytes, mask):
+    payload = bytes(i % 251 for i in range(length))
+    frame = encode_frame(payload, mask=mask)
+
+    if length < 126:
+        assert frame[1] & 0x7F == length
+    else:
+        assert frame[1] & 0x7F == (126 if header_size == 4 else 127)
+        assert frame[2:header_size] == length_bytes
+    assert len(frame) == header_size + (4 if mask else 0) + length
+    assert read_frame(io.BytesIO(frame)) == (True, OP_TEXT, payload)
+
+
+def test_truncated_frame_raises():
+    frame = encode_frame(b'x' * 300)
+    with pytest.raises(ConnectionError):
+        read_frame(io.BytesIO(frame[:-1]))
+
+
+# Connection: handshake, commands and replies
+
+def test_handshake_and_command(cdp_server):
+    conn = CDPConnection(cdp_server.browser_ws_url)
+    try:
+        result = conn.send('Target.getTargets')
+    finally:
+        conn.close()
+
+    assert [target['url'] for target in result['targetInfos']] == ['about:blank']
+    assert cdp_server.methods() == ['Target.getTargets']
+
+
+def test_bad_accept_key_fails_handshake(cdp_server):
+    cdp_server.bad_accept_key = True
+    with pytest.raises(CDPError, match='handshake'):
+        CDPConnection(cdp_server.browser_ws_url)
+
+
+def test_events_and_other_replies_are_skipped(cdp_server):
+    cdp_server.noise = [
+        {"method": "Target.targetCreated", "params": {"targetInfo": {"targetId": "X"}}},
+        {"id": 9999, "result": {"wrong": True}},
+        {"method": "Page.loadEventFired", "params": {"timestamp": 1}},
+    ]
+    conn = CDPConnection(cdp_server.browser_ws_url)
+    try:
+        first = conn.send('Target.createTarget', {"url": "http://a"})
+        second = conn.send('Target.getTargetInfo', {"targetId": first['targetId']})
+    finally:
+        conn.close()
+
+    assert 'wrong' not in first
+    assert second['targetInfo']['url'] == 'http://a'
+
+
+def test_fragmented_replies_and_pings(cdp_server):
+    cdp_server.fragment = True
+    cdp_server.ping_first = True
+    conn = CDPConnection(cdp_server.browser_ws_url)
+    try:
+        result = conn.send('Target.getTargets')
+        # Frames arrive in order, so the server has read the pong once it answers this
+        conn.send('Target.getTargets')
+    finally:
+        conn.close()
+
+    assert result['targetInfos'][0]['targetId'] == 'TARGET1'
+    assert cdp_server.pongs[0] == b'are you there'
+
+
+def test_large_reply_uses_64_bit_length(cdp_server):
+    target = cdp_server.add_target('http://big')
+    cdp_server.evaluate_results['document.body.innerHTML'] = 'x' * 100000
+    conn = CDPConnection(f"ws://127.0.0.1:{cdp_server.port}/devtools/page/{target}")
+    try:
+        result = conn.send('Runtime.evaluate', {"expression": 'document.body.innerHTML', "returnByValue": True})
+    finally:
+        conn.close()
+
+    assert result['result']['value'] == 'x' * 100000
+
+
+def test_error_reply_raises(cdp_server):
+    conn = CDPConnection(cdp_server.browser_ws_url)
+    try:
+        with pytest.raises(CDPError, match='No target with given id found'):
+            conn.send('Target.closeTarget', {"targetId": 'missing'})
+        # The connection stays usable after an error reply
+        assert conn.send('Target.getTargets')['targetInfos']
+    finally:
+        conn.close()
+
+
+def test_timeout_closes_connection(cdp_server):
+    cdp_server.handlers['Runtime.evaluate'] = lambda path, params: NO_REPLY
+    target = cdp_server.add_target('http://hung')
+    conn = CDPConnection(f"ws://127.0.0.1:{cdp_server.port}/devtools/page/{target}")
+
+    with pytest.raises(CDPError, match='Runtime.evaluate failed'):
+        conn.send('Runtime.evaluate', {"expression": 'while(1){}'}, timeout=0.3)
+    assert conn.closed
+    with pytest.raises(CDPError, match='closed'):
+        conn.send('Page.reload')
+
+
+def test_command_params_are_sent(cdp_server):
+    seen = []
+
+    def record(path, params):
+        seen.append(params)
+        return {}
+
+    cdp_server.handlers['Page.reload'] = record
+    target = cdp_server.add_target('http://a')
+    conn = CDPConnection(f"ws://127.0.0.1:{cdp_server.port}/devtools/page/{target}")
+    try:
+        conn.send('Page.reload', {"ignoreCache": True})
+        conn.send('Page.reload')
+    finally:
+        conn.close()
+
+    assert seen == [{"ignoreCache": True}, {}]
+
+
+# CDPBackend tab handling over Target.*
+
+@pytest.fixture
+def backend(cdp_server):
+    backend = CDPBackend(log=lambda message: None, port=cdp_server.port, attach=True)
+    backend.start()
+    yield backend
+    backend.quit()
+
+
+def test_backend_tabs(cdp_server, backend):
+    first = backend.first_tab()
+    assert first == 'TARGET1'
+
+    tab = backend.open_tab('http://a')
+    assert cdp_server.targets[tab]['url'] == 'http://a'
+    assert ('Target.createTarget', {"url": "http://a", "background": True}) in \
+        [(method, params) for _path, method, params in cdp_server.commands]
+
+    backend.activate(tab)
+    assert cdp_server.active_target == tab
+
+    backend.navigate(tab, 'http://b')
+    assert backend.get_url(tab) == 'http://b'
+
+    backend.close_tab(tab)
+    assert tab not in cdp_server.targets
+    assert tab not in backend.page_conns
+
+
+def test_backend_first_tab_creates_one_if_none(cdp_server, backend):
+    cdp_server.targets.clear()
+    tab = backend.first_tab()
+    assert list(cdp_server.targets) == [tab]
+
+
+def test_backend_page_commands_use_page_connection(cdp_server, backend):
+    tab = backend.open_tab('http://a')
+    cdp_server.evaluate_results['document.readyState'] = 'complete'
+
+    assert backend.evaluate(tab, 'document.readyState') == 'complete'
+    backend.reload(tab, background=True)
+    backend.set_frozen(tab, True)
+
+    page_commands = [method for path, method, _params in cdp_server.commands if path.endswith(tab)]
+    assert page_commands == ['Runtime.evaluate', 'Page.reload', 'Page.setWebLifecycleState']
+    assert cdp_server.targets[tab]['lifecycle'] == 'frozen'
+    # None of this changed the visible tab
+    assert cdp_server.active_target is None
+
+
+def test_backend_evaluate_exception(cdp_server, backend):
+    tab = backend.open_tab('http://a')
+    cdp_server.evaluate_results['boom()'] = FakeCDPError('ReferenceError: boom is not defined')
+
+    with pytest.raises(CDPError, match='boom is not defined'):
+        backend.evaluate(tab, 'boom()')
+
+
+def test_backend_reconnects_after_page_connection_failure(cdp_server, backend):
+    tab = backend.open_tab('http://a')
+    cdp_server.handlers['Runtime.evaluate'] = lambda path, params: NO_REPLY
+    with pytest.raises(CDPError):
+        backend.evaluate(tab, '1', timeout=0.3)
+
+    del cdp_server.handlers['Runtime.evaluate']
+    cdp_server.evaluate_results['1'] = 1
+    assert backend.evaluate(tab, '1') == 1
+
+
+def test_attached_backend_does_not_close_browser(cdp_server):
+    backend = CDPBackend(log=lambda message: None, port=cdp_server.port, attach=True)
+    backend.start()
+    backend.quit()
+    assert 'Browser.close' not in cdp_server.methods()
+
+
+def test_version_endpoint(cdp_server):
+    version = http_json(f"http://127.0.0.1:{cdp_server.port}", '/json/version')
+    assert version['webSocketDebuggerUrl'] == cdp_server.browser_ws_url
@@ -0,0 +1,31 @@
+#!/bin/bash
+# Vendor PDF.js for the kiosk PDF viewers
+# Downloads the PDF.js build once so viewers load it from the web manager
+# instead of the CDN on every tab refresh. Run from the announcements_kiosk directory.
+
+set -e  # Exit on error
+
+PDFJS_VERSION="3.11.174"
+CDN_BASE="https://cdnjs.cloudflare.com/ajax/libs/pdf.js/${PDFJS_VERSION}"
+TARGET_DIR="static/pdfjs"
+
+# Color codes for output
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+mkdir -p "$TARGET_DIR"
+
+for file in pdf.min.js pdf.worker.min.js; do
+    echo -e "${YELLOW}Downloading ${file} (PDF.js ${PDFJS_VERSION})...${NC}"
+    curl -fsSL "${CDN_BASE}/${file}" -o "${TARGET_DIR}/${file}.tmp"
+    mv "${TARGET_DIR}/${file}.tmp" "${TARGET_DIR}/${file}"
+done
+
+echo "$PDFJS_VERSION" > "${TARGET_DIR}/VERSION"
+
+echo -e "${GREEN}✓ PDF.js ${PDFJS_VERSION} vendored to ${TARGET_DIR}/${NC}"
+echo ""
+echo "Next steps:"
+echo "1. Run: python3 regenerate_html.py"
+echo "2. Run: sudo systemctl restart kiosk-web.service"
@@ -4,19 +4,29 @@ Kiosk Web Manager - Flask Web Application
 Provides a web interface for managing the kiosk display system
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory, make_response
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, make_response, redirect, abort
 import json
+import hashlib
 import subprocess
 import os
 from pathlib import Path
+from urllib.parse import urlparse, unquote, quote
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from html_generator import (
     generate_smartsheet_html,
     generate_pdf_html,
+    asset_digest,
     HTML_OUTPUT_DIR,
-    CONFIG_FILE
+    CONFIG_FILE,
+    PDFJS_DIR
 )
+from pdf_rasterizer import rasterize_in_background, get_render_status, get_render_statuses, is_rendered
+from playlist_schedule import PlaylistSchedule
+from control_socket import send_command, DEFAULT_CONTROL_SOCKET
+from config_store import get_store, ConfigConflict
+from event_hub import EventHub
+from log_buffer import LogBuffer, JournalFollower, LEVELS
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'kiosk-manager-secret-key-change-in-production'
@@ -31,7 +41,23 @@ if not PDF_UPLOAD_DIR.exists():
 HTML_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 PDF_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Parsed config.json, cached until the file changes; all writes go through it
+config_store = get_store(CONFIG_FILE)
+
 ALLOWED_EXTENSIONS = {'pdf'}
+VENDORED_PDFJS_FILES = {'pdf.min.js', 'pdf.worker.min.js'}
+
+# Dashboard event streams open at once (each holds a server thread)
+DEFAULT_MAX_EVENT_STREAMS = 4
+
+# Dashboard actions sent to the running controller (URL action -> control command)
+KIOSK_COMMANDS = {
+    'show': 'show',
+    'refresh': 'refresh',
+    'pause': 'pause',
+    'resume': 'resume',
+    'reload-config': 'reload_config'
+}
 
 
 def allowed_file(filename):
@@ -40,22 +66,133 @@ def allowed_file(filename):
 
 
 def load_config():
-    """Load the current configuration"""
+    """Load the current configuration (cached until config.json changes)"""
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
+        config, _etag = config_store.load()
+        return config
     except Exception as e:
         return {"urls": [], "cycle_delay": 40, "error": str(e)}
 
 
-def save_config(config):
-    """Save configuration to file"""
-    try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
-        return True, "Configuration saved successfully"
-    except Exception as e:
-        return False, f"Error saving config: {e}"
+def request_etags():
+    """ETags from the request's If-Match header, or None if it has none"""
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    return request.if_match.as_set()
+
+
+def config_saved(message, config, etag, **extra):
+    """JSON response for a saved config change, carrying the new ETag"""
+    response = jsonify({"success": True, "message": message, "config": config, **extra})
+    response.set_etag(etag)
+    return response
+
+
+def apply_operation(config, operation):
+    """
+    Apply one playlist edit to a config dict in place.
+
+    Operations (indices are 0-based positions in urls as they are when the
+    operation runs, i.e. after the operations before it):
+        {"op": "add", "url": ..., "position": index (optional, default: end)}
+        {"op": "remove", "index": ...}
+        {"op": "move", "from": ..., "to": ...}
+        {"op": "set_dwell", "url": ..., "dwell": seconds, or null for cycle_delay}
+        {"op": "set_delay", "cycle_delay": seconds}
+
+    Returns:
+        str: Description of the change
+
+    Raises:
+        ValueError: If the operation is unknown or its arguments are invalid
+    """
+    if not isinstance(operation, dict):
+        raise ValueError("Operation must be a JSON object")
+    op = operation.get('op')
+    urls = config.setdefault('urls', [])
+
+    def index_argument(name, end=0):
+        # end=1 also allows len(urls), i.e. the position after the last URL
+        value = operation.get(name)
+        if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value < len(urls) + end:
+            raise ValueError(f"Invalid {name}")
+        return value
+
+    if op == 'add':
+        url = operation.get('url')
+        if not url or not isinstance(url, str):
+            raise ValueError("URL is required")
+        if operation.get('position') is None:
+            urls.append(url)
+        else:
+            urls.insert(index_argument('position', end=1), url)
+        return f"Added: {url}"
+
+    if op == 'remove':
+        url = urls.pop(index_argument('index'))
+        if url not in urls:
+            # Drop its settings with it, unless the URL is still listed elsewhere
+            config.get('url_settings', {}).pop(url, None)
+        return f"Removed: {url}"
+
+    if op == 'move':
+        source, target = index_argument('from'), index_argument('to')
+        url = urls.pop(source)
+        urls.insert(target, url)
+        return f"Moved to position {target + 1}: {url}"
+
+    if op == 'set_dwell':
+        url = operation.get('url')
+        if url not in urls:
+            raise ValueError(f"URL is not in the playlist: {url}")
+        dwell = operation.get('dwell')
+        url_settings = config.setdefault('url_settings', {})
+        settings = url_settings.setdefault(url, {})
+        if dwell is None:
+            settings.pop('dwell', None)
+            if not settings:
+                del url_settings[url]
+            return f"Dwell reset to cycle delay: {url}"
+        if not isinstance(dwell, (int, float)) or isinstance(dwell, bool) or dwell <= 0:
+            raise ValueError("dwell must be a positive number of seconds")
+        settings['dwell'] = dwell
+        return f"Dwell {dwell}s: {url}"
+
+    if op == 'set_delay':
+        cycle_delay = operation.get('cycle_delay')
+        if not isinstance(cycle_delay, int) or isinstance(cycle_delay, bool) or cycle_delay <= 0:
+            raise ValueError("cycle_delay must be a positive integer")
+        config['cycle_delay'] = cycle_delay
+        return f"Cycle delay {cycle_delay}s"
+
+    raise ValueError(f"Unknown operation: {op}")
+
+
+def config_conflict(error):
+    """412 response for an edit based on an outdated config"""
+    return jsonify({"success": False, "message": str(error)}), 412
+
+
+def shell_frame_url(url):
+    """
+    Return the address the kiosk shell should load a playlist URL from.
+
+    The shell is served over http, which may not frame file:// pages, so
+    local files in the HTML and PDF directories are mapped to the routes
+    that serve them. Other URLs are used as they are.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme != 'file':
+        return url
+
+    path = Path(unquote(parsed.path)).resolve()
+    for prefix, directory in (('/html/', HTML_OUTPUT_DIR), ('/pdfs/', PDF_UPLOAD_DIR)):
+        try:
+            relative = path.relative_to(directory.resolve())
+        except ValueError:
+            continue
+        return prefix + quote(relative.as_posix())
+    return url
 
 
 def get_service_status():
@@ -72,11 +209,52 @@ def get_service_status():
         return "unknown"
 
 
+def control_kiosk(command, **args):
+    """
+    Send a command to the running kiosk controller over its control socket.
+
+    Returns:
+        dict: The controller's response ({"success", "message", ...})
+    """
+    path = load_config().get('control_socket', str(DEFAULT_CONTROL_SOCKET))
+    if not path:
+        return {"success": False, "message": "Control socket is disabled in config"}
+    try:
+        return send_command(command, path=Path(path).expanduser(), **args)
+    except (OSError, ValueError) as e:
+        return {"success": False, "message": f"Kiosk controller not reachable: {e}"}
+
+
+def kiosk_state_event():
+    """What the controller is showing, for the event stream (None while it is not reachable)"""
+    state = control_kiosk('state')
+    return state if state.get('success') else None
+
+
+# One watcher feeds every open dashboard: a tick costs one systemctl call
+# and one controller query however many dashboards are connected
+event_hub = EventHub({
+    'service': lambda: {"status": get_service_status()},
+    'config': lambda: {"etag": config_store.etag()},
+    'kiosk': kiosk_state_event,
+    'renders': get_render_statuses
+})
+
+
 def restart_service():
-    """Restart the kiosk service"""
+    """
+    Restart the kiosk browser.
+
+    Asks the running controller to restart its browser; only if it cannot
+    be reached is the service itself (re)started via systemctl.
+    """
+    response = control_kiosk('restart_browser')
+    if response['success']:
+        return True, "Kiosk browser restarting"
+
     try:
         subprocess.run(
-            ['sudo', 'systemctl', 'restart', 'kiosk.service'],
+            ['sudo', 'systemctl', 'reload-or-restart', 'kiosk.service'],
             capture_output=True,
             text=True,
             timeout=10
@@ -86,18 +264,17 @@ def restart_service():
         return False, f"Error restarting service: {e}"
 
 
-def get_recent_logs(lines=50):
-    """Get recent log entries from the kiosk service"""
-    try:
-        result = subprocess.run(
-            ['journalctl', '-u', 'kiosk.service', '-n', str(lines), '--no-pager'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        return result.stdout
-    except Exception as e:
-        return f"Error fetching logs: {e}"
+# Kiosk service log, followed by one journalctl process from the first time it is viewed
+kiosk_logs = LogBuffer(capacity=2000)
+journal_follower = JournalFollower('kiosk.service', kiosk_logs)
+
+
+def format_log_entry(entry):
+    """One log entry as a journalctl-style text line"""
+    line = f"{datetime.fromtimestamp(entry['time']):%b %d %H:%M:%S} {entry['message']}"
+    if entry['repeat'] > 1:
+        line += f" (repeated {entry['repeat']} times)"
+    return line
 
 
 # Routes
@@ -107,21 +284,73 @@ def index():
     return render_template('index.html')
 
 
+@app.route('/shell')
+def shell():
+    """Single-tab kiosk shell that plays the playlist in two swapping iframes"""
+    return render_template('shell.html')
+
+
+@app.route('/api/shell/playlist')
+def api_shell_playlist():
+    """
+    Playlist for the kiosk shell (ETag-validated so the shell can poll cheaply).
+
+    Only pages inside their schedule window are listed, so the ETag changes
+    and the shell picks up the new list when a window opens or closes.
+    """
+    config = load_config()
+    schedule = PlaylistSchedule()
+    try:
+        schedule.configure(config)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+    playlist = {
+        "cycle_delay": config.get('cycle_delay', 40),
+        "prewarm_seconds": config.get('prewarm_seconds', 5),
+        "items": [
+            {"url": url, "src": shell_frame_url(url), "dwell": schedule.dwell_for(url)}
+            for url in config.get('urls', []) if schedule.is_active(url)
+        ]
+    }
+    body = json.dumps(playlist, sort_keys=True)
+
+    response = make_response(body)
+    response.mimetype = 'application/json'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(hashlib.sha256(body.encode()).hexdigest()[:16])
+    return response.make_conditional(request)
+
+
 @app.route('/api/config')
 def api_config():
-    """Get current configuration"""
-    config = load_config()
-    config['service_status'] = get_service_status()
-    return jsonify(config)
+    """Get current configuration (ETag-validated, so polling it is cheap)"""
+    try:
+        etag = config_store.etag()
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            config, etag = config_store.load()
+            response = jsonify(config)
+    except Exception as e:
+        return jsonify({"urls": [], "cycle_delay": 40, "error": str(e)})
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @app.route('/api/config/update', methods=['POST'])
 def api_config_update():
-    """Update configuration"""
+    """Update configuration (send If-Match with the ETag it was loaded with)"""
     try:
         new_config = request.json
-        success, message = save_config(new_config)
-        return jsonify({"success": success, "message": message})
+        if not isinstance(new_config, dict):
+            return jsonify({"success": False, "message": "Configuration must be a JSON object"}), 400
+        config, etag = config_store.save(new_config, if_match=request_etags())
+        return config_saved("Configuration saved successfully", config, etag)
+    except ConfigConflict as e:
+        return config_conflict(e)
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 400
 
@@ -137,15 +366,13 @@ def api_url_add():
         if not url:
             return jsonify({"success": False, "message": "URL is required"}), 400
         
-        config = load_config()
-        
-        if position is not None and 0 <= position <= len(config['urls']):
-            config['urls'].insert(position, url)
-        else:
-            config['urls'].append(url)
+        def add_url(config):
+            apply_operation(config, {"op": "add", "url": url, "position": position})
         
-        success, message = save_config(config)
-        return jsonify({"success": success, "message": message, "config": config})
+        config, etag = config_store.update(add_url, if_match=request_etags())
+        return config_saved("Configuration saved successfully", config, etag)
+    except ConfigConflict as e:
+        return config_conflict(e)
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 400
 
@@ -160,18 +387,15 @@ def api_url_remove():
         if index is None:
             return jsonify({"success": False, "message": "Index is required"}), 400
         
-        config = load_config()
+        changes = []
         
-        if 0 <= index < len(config['urls']):
-            removed_url = config['urls'].pop(index)
-            success, message = save_config(config)
-            return jsonify({
-                "success": success,
-                "message": f"Removed: {removed_url}",
-                "config": config
-            })
-        else:
-            return jsonify({"success": False, "message": "Invalid index"}), 400
+        def remove_url(config):
+            changes.append(apply_operation(config, {"op": "remove", "index": index}))
+        
+        config, etag = config_store.update(remove_url, if_match=request_etags())
+        return config_saved(changes[0], config, etag)
+    except ConfigConflict as e:
+        return config_conflict(e)
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 400
 
@@ -186,11 +410,44 @@ def api_url_reorder():
         if not new_order or not isinstance(new_order, list):
             return jsonify({"success": False, "message": "Invalid URL list"}), 400
         
-        config = load_config()
-        config['urls'] = new_order
+        def reorder(config):
+            config['urls'] = new_order
+        
+        config, etag = config_store.update(reorder, if_match=request_etags())
+        return config_saved("Configuration saved successfully", config, etag)
+    except ConfigConflict as e:
+        return config_conflict(e)
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+
+@app.route('/api/config/batch', methods=['POST'])
+def api_config_batch():
+    """
+    Apply a list of playlist edits as one config revision.
+
+    Body: {"operations": [...]} (see apply_operation). The operations run
+    in order on the latest config; if any of them fails nothing is saved,
+    otherwise the result is written once, so the kiosk reloads once.
+    """
+    try:
+        operations = (request.get_json(silent=True) or {}).get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({"success": False, "message": "operations must be a non-empty list"}), 400
+        
+        changes = []
         
-        success, message = save_config(config)
-        return jsonify({"success": success, "message": message, "config": config})
+        def apply_all(config):
+            for number, operation in enumerate(operations, 1):
+                try:
+                    changes.append(apply_operation(config, operation))
+                except ValueError as e:
+                    raise ValueError(f"Operation {number}: {e}")
+        
+        config, etag = config_store.update(apply_all, if_match=request_etags())
+        return config_saved(f"Applied {len(changes)} changes", config, etag, changes=changes)
+    except ConfigConflict as e:
+        return config_conflict(e)
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 400
 
@@ -215,9 +472,7 @@ def api_smartsheet_create():
         
         # Add to config if requested
         if add_to_config:
-            config = load_config()
-            config['urls'].append(http_url)
-            save_config(config)
+            config_store.update(lambda config: config.setdefault('urls', []).append(http_url))
         
         return jsonify({
             "success": True,
@@ -250,9 +505,7 @@ def api_pdf_create():
         
         # Add to config if requested
         if add_to_config:
-            config = load_config()
-            config['urls'].append(http_url)
-            save_config(config)
+            config_store.update(lambda config: config.setdefault('urls', []).append(http_url))
         
         return jsonify({
             "success": True,
@@ -279,12 +532,81 @@ def api_service_restart():
     return jsonify({"success": success, "message": message})
 
 
+@app.route('/api/kiosk/state')
+def api_kiosk_state():
+    """Get what the running kiosk is showing"""
+    return jsonify(control_kiosk('state'))
+
+
+@app.route('/api/kiosk/<action>', methods=['POST'])
+def api_kiosk_command(action):
+    """Send a live command to the running kiosk (show, refresh, pause, resume, reload-config)"""
+    command = KIOSK_COMMANDS.get(action)
+    if command is None:
+        return jsonify({"success": False, "message": f"Unknown action: {action}"}), 404
+
+    data = request.get_json(silent=True) or {}
+    args = {'index': data['index']} if 'index' in data else {}
+    return jsonify(control_kiosk(command, **args))
+
+
+@app.route('/api/events')
+def api_events():
+    """
+    Server-Sent Events stream for the dashboard.
+
+    Sends the current value of each event (service, config, kiosk, renders)
+    on connect and again whenever it changes. Every stream holds a server
+    thread, so at most web_server.max_event_streams are open at once and
+    each ends after a few minutes (EventSource reconnects by itself).
+    """
+    limit = int((load_config().get('web_server') or {}).get('max_event_streams', DEFAULT_MAX_EVENT_STREAMS))
+    subscription = event_hub.subscribe(limit=limit)
+    if subscription is None:
+        return jsonify({"success": False, "message": "Too many open dashboards; poll instead"}), 503
+
+    def stream():
+        yield 'retry: 5000\n\n'
+        for event, data in subscription:
+            if event is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+    response = Response(stream(), mimetype='text/event-stream')
+    # Frees the place even if the stream never started
+    response.call_on_close(subscription.close)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop a reverse proxy from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @app.route('/api/logs')
 def api_logs():
-    """Get recent logs"""
-    lines = request.args.get('lines', 50, type=int)
-    logs = get_recent_logs(lines)
-    return jsonify({"logs": logs})
+    """
+    Get kiosk service log entries from the in-memory buffer.
+
+    Query parameters: since (cursor from the previous response, for new
+    entries only), lines (newest N entries), level (minimum level),
+    q (text to search for) and wait (seconds to wait for a new entry).
+    """
+    level = request.args.get('level') or None
+    if level and level.upper() not in LEVELS:
+        return jsonify({"success": False, "message": f"Unknown level: {level} (expected {', '.join(LEVELS)})"}), 400
+
+    since = request.args.get('since', 0, type=int)
+    journal_follower.start()
+    result = kiosk_logs.query(
+        since=since,
+        level=level,
+        text=request.args.get('q') or None,
+        # The newest 50 on first load, then everything new
+        limit=request.args.get('lines', None if since else 50, type=int),
+        wait=min(request.args.get('wait', 0, type=float), 10)
+    )
+    result["logs"] = "\n".join(format_log_entry(entry) for entry in result["entries"])
+    return jsonify(result)
 
 
 @app.route('/api/html-files')
@@ -335,13 +657,17 @@ def api_pdf_upload():
         file_size = file_path.stat().st_size
         file_url = f"file://{file_path}"
         
+        # Pre-render pages to images in the background so viewers can skip PDF.js
+        rasterize_in_background(file_path)
+        
         return jsonify({
             "success": True,
             "message": f"Uploaded {filename} successfully",
             "filename": filename,
             "path": str(file_path),
             "url": file_url,
-            "size": file_size
+            "size": file_size,
+            "render_status": "queued"
         })
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 400
@@ -359,13 +685,23 @@ def api_pdf_list():
                     "path": file.name,  # Just the filename for HTML generation
                     "url": f"http://localhost:5000/pdfs/{file.name}",  # HTTP URL for direct access
                     "size": file.stat().st_size,
-                    "modified": datetime.fromtimestamp(file.stat().st_mtime).isoformat()
+                    "modified": datetime.fromtimestamp(file.stat().st_mtime).isoformat(),
+                    "rendered": is_rendered(file)
                 })
         return jsonify({"files": files})
     except Exception as e:
         return jsonify({"files": [], "error": str(e)})
 
 
+@app.route('/api/pdf/render-status/<filename>')
+def api_pdf_render_status(filename):
+    """Get the background rasterization status of an uploaded PDF"""
+    status = get_render_status(PDF_UPLOAD_DIR / secure_filename(filename))
+    if status is None:
+        return jsonify({"state": "none"})
+    return jsonify(status)
+
+
 @app.route('/html/<path:filename>')
 def serve_html(filename):
     """Serve HTML files from the html directory"""
@@ -374,15 +710,39 @@ def serve_html(filename):
 
 @app.route('/pdfs/<path:filename>')
 def serve_pdf(filename):
-    """Serve PDF files from the pdfs directory with proper headers for PDF.js"""
+    """Serve PDF files (and their rendered page images) with proper headers for PDF.js"""
     response = make_response(send_from_directory(PDF_UPLOAD_DIR, filename))
-    response.headers['Content-Type'] = 'application/pdf'
+    if filename.lower().endswith('.pdf'):
+        response.headers['Content-Type'] = 'application/pdf'
+        # Always revalidate so viewers see a replaced PDF, and let them read the
+        # validators they key their rendered-page cache on
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Access-Control-Expose-Headers'] = 'ETag, Last-Modified, Content-Length'
     response.headers['Access-Control-Allow-Origin'] = '*'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, HEAD, OPTIONS'
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
     return response
 
 
+@app.route('/vendor/pdfjs/<digest>/<filename>')
+def serve_vendored_pdfjs(digest, filename):
+    """Serve the vendored PDF.js build from immutable, content-hashed URLs"""
+    if filename not in VENDORED_PDFJS_FILES or not (PDFJS_DIR / filename).exists():
+        abort(404)
+    
+    current = asset_digest(PDFJS_DIR / filename)
+    if digest != current:
+        # Page generated against an older build - point it at the current one (not cached)
+        return redirect(f'/vendor/pdfjs/{current}/{filename}')
+    
+    response = make_response(send_from_directory(PDFJS_DIR, filename, mimetype='text/javascript'))
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
 if __name__ == '__main__':
+    # Development server with reloader and debugger; kiosk-web.service runs
+    # the app under gunicorn instead (see gunicorn.conf.py)
     # Run on all network interfaces so it's accessible from other devices
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)